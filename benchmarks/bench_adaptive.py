@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation against a backend enforcing a per-operation quota of 500
+requests per second, behind the retry layer: fixed worker counts that are
+too small, about right and too large, and the AIMD limit finding its own.
+
+    python -m benchmarks.bench_adaptive
+"""
+
+from sample import rotate
+from sample.concurrency import AIMDLimit
+from sample.logs import ERROR
+from sample.resilience import ResilientBackend, reset_endpoint_guards
+
+from .slow_backend import ThrottlingBackend, seeded
+
+
+def run(name, rotate_all, secrets):
+    reset_endpoint_guards()
+    inner, secret_ids = seeded(secrets, backend_class=ThrottlingBackend)
+    report = rotate_all(secret_ids, ResilientBackend(inner, endpoint=name))
+    print(f"{name:<14}{len(report.succeeded):>6} ok{len(report.failed):>6} "
+          f"failed{report.throughput:>9.1f} rotations/s"
+          f"{inner.calls:>8} calls{inner.throttled:>8} throttled")
+
+
+def main(secrets=3000):
+    rotate.log.level = ERROR
+    for workers in (4, 16, 256):
+        run(f"{workers} workers", lambda ids, backend: rotate.rotate_many(
+            ids, backend=backend, max_workers=workers), secrets)
+
+    limit = AIMDLimit()
+    run("adaptive", lambda ids, backend: rotate.rotate_many_adaptive(
+        ids, backend=backend, limit=limit), secrets)
+    print(f"{'':<14}final {limit!r}")
+
+
+if __name__ == "__main__":
+    main()
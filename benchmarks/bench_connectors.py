@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+password changes per second against a local stand-in for the Elasticsearch
+password endpoint, opening a connection per call versus the keep-alive pool.
+Plain HTTP on loopback, so the saving shown is the TCP set-up and teardown
+alone, a TLS handshake per call costs far more on a real cluster.
+
+    python -m benchmarks.bench_connectors
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sample.connectors import ConnectionPool, ElasticsearchConnector
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # like real servers, or Nagle holds the body back behind the headers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+def run(name, server, maxsize, calls, workers):
+    host, port = server.server_address
+    pool = ConnectionPool("http", host, port, maxsize=maxsize)
+    connector = ElasticsearchConnector(f"http://{host}:{port}",
+                                       auth=("elastic", "changeme"),
+                                       pool=pool)
+    server.connections = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(
+            lambda i: connector.set_password(SecretId=f"user{i}",
+                                             Password="x" * 32),
+            range(calls)))
+    elapsed = time.perf_counter() - start
+    pool.close()
+    print(f"{name:<22}{calls / elapsed:>9.1f} calls/s"
+          f"{server.connections:>6} connections")
+
+
+def main(calls=2000, workers=8):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        run("connection per call", server, 0, calls, workers)
+        run("keep-alive pool", server, workers, calls, workers)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
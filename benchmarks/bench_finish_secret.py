@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+AWSCURRENT lookup cost on secrets with thousands of labelled versions:
+fetching every page and scanning every stage, as finishSecret used to, versus
+the streaming `find_staged_version` that stops at the first hit.
+
+    python -m benchmarks.bench_finish_secret
+"""
+
+import timeit
+
+from sample.backends import AWSCURRENT, InMemoryBackend
+from sample.rotate import LIST_PAGE_SIZE, find_staged_version
+
+
+def build(versions, current_at):
+    backend = InMemoryBackend()
+    backend.create_secret(Name="bench", SecretString="v0",
+                          ClientRequestToken="v0")
+    for i in range(1, versions):
+        backend.put_secret_value(SecretId="bench", ClientRequestToken=f"v{i}",
+                                 SecretString=f"v{i}",
+                                 VersionStages=[f"build-{i}"])
+    if current_at:
+        backend.update_secret_version_stage(
+            SecretId="bench", VersionStage=AWSCURRENT,
+            MoveToVersionId=f"v{current_at}", RemoveFromVersionId="v0")
+    return backend
+
+
+def full_scan(backend):
+    found = None
+    kwargs = dict(SecretId="bench", MaxResults=LIST_PAGE_SIZE)
+    while True:
+        page = backend.list_secret_version_ids(**kwargs)
+        for version in page["Versions"]:
+            for stage in version["VersionStages"]:
+                if stage == AWSCURRENT:
+                    found = version["VersionId"]
+        if "NextToken" not in page:
+            return found
+        kwargs["NextToken"] = page["NextToken"]
+
+
+def streaming(backend):
+    lookup = find_staged_version("bench", AWSCURRENT)
+    response = None
+    try:
+        while True:
+            operation, kwargs = lookup.send(response)
+            response = getattr(backend, operation)(**kwargs)
+    except StopIteration as stop:
+        return stop.value
+
+
+def main(versions=5000, number=50):
+    print(f"{versions} versions, page size {LIST_PAGE_SIZE}")
+    print(f"{'AWSCURRENT at':<16}{'full scan ms':>14}{'streaming ms':>14}")
+    for current_at in (0, versions // 2, versions - 1):
+        backend = build(versions, current_at)
+        assert full_scan(backend) == streaming(backend) == f"v{current_at}"
+        full = timeit.timeit(lambda: full_scan(backend), number=number)
+        stream = timeit.timeit(lambda: streaming(backend), number=number)
+        print(f"{current_at:<16}{full / number * 1e3:>14.3f}"
+              f"{stream / number * 1e3:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
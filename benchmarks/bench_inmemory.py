@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+raw operation throughput of `InMemoryBackend` and full four-step rotations of
+`handle_event` against it.
+
+    python -m benchmarks.bench_inmemory
+"""
+
+import contextlib
+import io
+import time
+
+from sample import rotate
+from sample.backends import AWSPENDING, InMemoryBackend
+
+STEPS = ("createSecret", "setSecret", "testSecret", "finishSecret")
+
+
+def bench_operations(operations, secrets=10_000):
+    backend = InMemoryBackend()
+    for i in range(secrets):
+        backend.create_secret(Name=f"secret-{i}", SecretString="seed",
+                              ClientRequestToken="v0")
+
+    start = time.perf_counter()
+    for i in range(operations // 4):
+        secret_id = f"secret-{i % secrets}"
+        generation = i // secrets
+        token = f"v{generation + 1}"
+        backend.put_secret_value(SecretId=secret_id, ClientRequestToken=token,
+                                 SecretString=token,
+                                 VersionStages=[AWSPENDING])
+        backend.get_secret_value(SecretId=secret_id, VersionId=token)
+        backend.list_secret_version_ids(SecretId=secret_id)
+        backend.update_secret_version_stage(
+            SecretId=secret_id, VersionStage="AWSCURRENT",
+            MoveToVersionId=token, RemoveFromVersionId=f"v{generation}")
+    return operations / (time.perf_counter() - start)
+
+
+def bench_rotations(secrets):
+    backend = InMemoryBackend()
+    for i in range(secrets):
+        backend.create_secret(Name=f"secret-{i}", SecretString="seed")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(secrets):
+            for step in STEPS:
+                rotate.handle_event(
+                    {"Step": step, "SecretId": f"secret-{i}",
+                     "ClientRequestToken": "next"},
+                    None, backend=backend)
+    return secrets / (time.perf_counter() - start)
+
+
+def main(operations=1_000_000, secrets=50_000):
+    print(f"backend operations/s: {bench_operations(operations):,.0f}")
+    print(f"rotations/s:          {bench_rotations(secrets):,.0f}")
+
+
+if __name__ == "__main__":
+    main()
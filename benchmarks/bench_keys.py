@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+key pairs per second generated in the calling thread and on the process pool
+of `sample.keys` with 1, 2, 4, ... processes up to the number of cores. Pool
+start-up is excluded, each pool is warmed with one batch first. Needs the
+cryptography package.
+
+    python -m benchmarks.bench_keys
+"""
+
+import os
+import time
+
+from sample import keys
+
+COUNTS = {keys.RSA: 64, keys.ED25519: 20000}
+
+
+def rate(generate, count):
+    start = time.perf_counter()
+    generate(count)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    processes = [1]
+    while processes[-1] * 2 <= cores:
+        processes.append(processes[-1] * 2)
+    if processes[-1] != cores:
+        processes.append(cores)
+
+    for key_type, count in COUNTS.items():
+        in_thread = rate(lambda n: [keys.generate_key_pair(key_type)
+                                    for _ in range(n)], count)
+        print(f"{key_type:<8}{'in thread':>14}{in_thread:>12.1f} keys/s")
+        for n in processes:
+            keys.shutdown_key_pool()
+            keys.generate_key_pairs(n, key_type, processes=n)
+            pooled = rate(lambda c: keys.generate_key_pairs(c, key_type),
+                          count)
+            print(f"{key_type:<8}{n:>4} processes{pooled:>12.1f} keys/s"
+                  f"{pooled / n:>12.1f} per process")
+        keys.shutdown_key_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+one rotation the Lambda way, four invocations each starting a fresh Python
+process and handling one step, versus `rotate_locally` handling all four
+steps in one process. Every backend call costs 5ms, and each invocation
+starts without a warm version cache as if it landed on a new container.
+
+    python -m benchmarks.bench_local
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from sample import rotate
+from sample.backends import CachingBackend, VersionCache
+from sample.local import rotate_locally
+from sample.logs import ERROR
+from sample.metrics import InstrumentedBackend, Metrics
+
+from .slow_backend import seeded
+
+COLD_START = [sys.executable, "-c", "import sample.rotate"]
+
+
+def cold_start(runs=5):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(COLD_START, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def per_step(backend, secret_id):
+    start = time.perf_counter()
+    for step in rotate.ROTATION_STEPS:
+        # a new container has an empty version cache
+        rotate.handle_event(
+            {"Step": step, "SecretId": secret_id,
+             "ClientRequestToken": "next"},
+            None, backend=CachingBackend(backend, VersionCache()))
+    return time.perf_counter() - start
+
+
+def main(rotations=20):
+    rotate.log.level = ERROR
+    process = cold_start()
+    print(f"process start and import: {process * 1000:.1f} ms")
+
+    for name, run, starts in (
+            ("four invocations", per_step, 4),
+            ("rotate_locally", lambda backend, secret_id: rotate_locally(
+                secret_id, token="next", backend=backend).elapsed, 1)):
+        inner, secret_ids = seeded(rotations)
+        calls = Metrics(enabled=True)
+        backend = InstrumentedBackend(inner, calls)
+        elapsed = statistics.median(
+            run(backend, secret_id) for secret_id in secret_ids)
+        total = elapsed + starts * process
+        count = sum(histogram.count for histogram in calls.histograms.values())
+        print(f"{name:<18}{count / rotations:>5.1f} calls"
+              f"{elapsed * 1000:>8.1f} ms steps"
+              f"{total * 1000:>8.1f} ms with process starts")
+
+
+if __name__ == "__main__":
+    main()
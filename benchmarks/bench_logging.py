@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+cost of the rotation log lines from concurrent workers: synchronous print
+with f-strings, as the steps used to log, versus the buffered structured
+logger. Both write to a line-buffered file, which is how stdout behaves when
+it is attached to a console or a log collector running unbuffered.
+
+    python -m benchmarks.bench_logging
+"""
+
+import contextlib
+import tempfile
+import threading
+import time
+
+from sample.logs import BufferedWriter, StructuredLogger
+
+
+def run_threads(workers, work):
+    threads = [threading.Thread(target=work, args=(i,))
+               for i in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main(workers=16, events=20_000):
+    total = workers * events
+
+    with tempfile.TemporaryFile("w", buffering=1) as sink:
+        def printing(worker):
+            for i in range(events):
+                print(f"setting the new password from secret secret-{worker} "
+                      f"for version {i}")
+
+        with contextlib.redirect_stdout(sink):
+            elapsed = run_threads(workers, printing)
+        print(f"print               {total / elapsed:>12,.0f} lines/s")
+
+        logger = StructuredLogger(
+            "bench", writer=BufferedWriter(sink, interval=0.1))
+
+        def logging(worker):
+            for i in range(events):
+                logger.info("setting the new password",
+                            secret_id=f"secret-{worker}", version=i)
+
+        emitted = run_threads(workers, logging)
+        start = time.perf_counter()
+        logger.flush()
+        flushed = emitted + time.perf_counter() - start
+        print(f"structured, emit    {total / emitted:>12,.0f} lines/s")
+        print(f"structured, flushed {total / flushed:>12,.0f} lines/s")
+
+        logger = StructuredLogger(
+            "bench", level="WARNING", writer=BufferedWriter(sink))
+
+        def gated(worker):
+            for i in range(events):
+                logger.info("setting the new password",
+                            secret_id=f"secret-{worker}", version=i)
+
+        elapsed = run_threads(workers, gated)
+        print(f"structured, gated   {total / elapsed:>12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
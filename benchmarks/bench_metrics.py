@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+overhead of step and backend call instrumentation on full in-memory
+rotations, with metrics disabled and enabled.
+
+    python -m benchmarks.bench_metrics
+"""
+
+import time
+
+from sample import rotate
+from sample.backends import InMemoryBackend
+from sample.logs import ERROR
+
+
+def rotations_per_second(secrets):
+    backend = InMemoryBackend()
+    for i in range(secrets):
+        backend.create_secret(Name=f"secret-{i}", SecretString="seed")
+    start = time.perf_counter()
+    for i in range(secrets):
+        rotate.rotate_secret(f"secret-{i}", backend=backend)
+    return secrets / (time.perf_counter() - start)
+
+
+def main(secrets=50_000):
+    # keep log formatting out of the comparison
+    rotate.log.level = ERROR
+    rotate.metrics.enabled = False
+    disabled = rotations_per_second(secrets)
+    rotate.metrics.enabled = True
+    enabled = rotations_per_second(secrets)
+    print(f"metrics disabled {disabled:>10,.0f} rotations/s")
+    print(f"metrics enabled  {enabled:>10,.0f} rotations/s "
+          f"({(disabled / enabled - 1) * 100:.1f}% overhead)")
+    for name, summary in rotate.metrics.snapshot()["Step"].items():
+        print(f"  {name:<14} p50 {summary['p50'] * 1e6:6.1f}us "
+              f"p99 {summary['p99'] * 1e6:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+per-password cost of `generate_password` against the previous
+`random.choice` implementation, and batch throughput of `generate_passwords`.
+
+    python -m benchmarks.bench_passwords
+"""
+
+import random
+import string
+import time
+import timeit
+
+from sample.passwords import generate_password, generate_passwords
+
+
+def legacy_generate_password(length):
+    pool = f"{string.ascii_letters}{string.digits}"
+    return "".join(random.choice(pool) for i in range(length))
+
+
+def per_call(func, length):
+    timer = timeit.Timer(lambda: func(length))
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number
+
+
+def batch_rates(count, length):
+    rates = {}
+    for name, produce in (
+        ("legacy loop", lambda: [legacy_generate_password(length)
+                                 for _ in range(count)]),
+        ("generate_password loop", lambda: [generate_password(length)
+                                            for _ in range(count)]),
+        ("generate_passwords", lambda: generate_passwords(count, length)),
+        ("generate_passwords lazy", lambda: list(
+            generate_passwords(count, length, lazy=True))),
+    ):
+        start = time.perf_counter()
+        produce()
+        rates[name] = count / (time.perf_counter() - start)
+    return rates
+
+
+def main(lengths=(16, 32, 64, 256, 1024, 4096), batch=100_000):
+    print(f"{'length':>7}{'legacy us':>12}{'urandom us':>12}{'speedup':>10}")
+    for length in lengths:
+        legacy = per_call(legacy_generate_password, length)
+        current = per_call(generate_password, length)
+        print(f"{length:>7}{legacy * 1e6:>12.2f}{current * 1e6:>12.2f}"
+              f"{legacy / current:>9.1f}x")
+
+    print(f"\n{batch:,} passwords of 32 characters")
+    for name, rate in batch_rates(batch, 32).items():
+        print(f"{name:<26}{rate:>14,.0f} passwords/s")
+
+
+if __name__ == "__main__":
+    main()
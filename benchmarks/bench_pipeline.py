@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation with 16 threads either way: 16 workers each taking one secret
+through all four steps, and the four steps as pipeline stages, with four
+threads each or with threads sized to the calls each step makes (finishSecret
+lists and updates, the others make one call). Every backend call costs 5ms.
+
+    python -m benchmarks.bench_pipeline
+"""
+
+from sample import rotate
+from sample.logs import ERROR
+
+from .slow_backend import seeded
+
+
+def run(name, rotate_all, secrets):
+    backend, secret_ids = seeded(secrets)
+    report = rotate_all(secret_ids, backend)
+    latencies = sorted(result.elapsed for result in report.results)
+    p50 = latencies[len(latencies) // 2]
+    print(f"{name:<22}{len(report.succeeded):>6} ok"
+          f"{report.throughput:>9.1f} rotations/s{p50 * 1000:>8.1f} ms p50")
+
+
+def main(secrets=2000):
+    rotate.log.level = ERROR
+    run("16 workers", lambda ids, backend: rotate.rotate_many(
+        ids, backend=backend, max_workers=16), secrets)
+    run("pipeline 4/4/4/4", lambda ids, backend: rotate.rotate_many_pipelined(
+        ids, backend=backend, stage_workers=4), secrets)
+    run("pipeline 3/3/3/7", lambda ids, backend: rotate.rotate_many_pipelined(
+        ids, backend=backend, stage_workers=[3, 3, 3, 7]), secrets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+constructive `PasswordPolicy` generation against regenerating random
+passwords until one complies.
+
+    python -m benchmarks.bench_policies
+"""
+
+import time
+
+from sample.passwords import (AMBIGUOUS, DIGITS, LOWERCASE, SYMBOLS,
+                              UPPERCASE, PasswordPolicy, random_string)
+
+POLICIES = {
+    "2 of each class, 12 chars": (12, dict(
+        min_lowercase=2, min_uppercase=2, min_digits=2, min_symbols=2,
+        symbols=SYMBOLS)),
+    "3 of each class, 12 chars, no ambiguous": (12, dict(
+        min_lowercase=3, min_uppercase=3, min_digits=3, min_symbols=3,
+        symbols=SYMBOLS, exclude=AMBIGUOUS)),
+    "4 digits 4 symbols, 16 chars, no repeats": (16, dict(
+        min_digits=4, min_symbols=4, symbols=SYMBOLS, no_repeats=True)),
+}
+
+
+def complies(pwd, rules):
+    exclude = rules.get("exclude", "")
+    for chars, key in ((LOWERCASE, "min_lowercase"),
+                       (UPPERCASE, "min_uppercase"), (DIGITS, "min_digits"),
+                       (rules.get("symbols", ""), "min_symbols")):
+        if sum(c in chars for c in pwd) < rules.get(key, 0):
+            return False
+    if rules.get("no_repeats") and len(set(pwd)) != len(pwd):
+        return False
+    return not set(pwd) & set(exclude)
+
+
+def retry(length, rules, alphabet):
+    attempts = 0
+    while True:
+        attempts += 1
+        pwd = random_string(length, alphabet)
+        if complies(pwd, rules):
+            return attempts
+
+
+def main(count=20_000):
+    for name, (length, rules) in POLICIES.items():
+        policy = PasswordPolicy(**rules)
+
+        start = time.perf_counter()
+        attempts = sum(retry(length, rules, policy.alphabet)
+                       for _ in range(count))
+        retry_rate = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            policy.generate(length)
+        policy_rate = count / (time.perf_counter() - start)
+
+        print(f"{name}\n  retry loop    {retry_rate:>10,.0f}/s "
+              f"({attempts / count:.1f} attempts per password)\n"
+              f"  constructive  {policy_rate:>10,.0f}/s "
+              f"({policy_rate / retry_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
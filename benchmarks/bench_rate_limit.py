@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation against a backend enforcing a per-operation quota of 500
+requests per second: the retry layer alone, which finds the quota by getting
+throttled, and the same layer behind a client-side rate limiter set to the
+quota, which should waste (almost) no calls on throttling.
+
+    python -m benchmarks.bench_rate_limit
+"""
+
+from sample import rotate
+from sample.logs import ERROR
+from sample.resilience import (RateLimitedBackend, RateLimiter,
+                               ResilientBackend, reset_endpoint_guards)
+
+from .slow_backend import ThrottlingBackend, seeded
+
+QUOTA = 500.0
+OPERATIONS = ("put_secret_value", "get_secret_value",
+              "list_secret_version_ids", "update_secret_version_stage")
+
+
+def run(name, wrap, secrets, workers):
+    reset_endpoint_guards()
+    inner, secret_ids = seeded(secrets, backend_class=ThrottlingBackend,
+                               quota=QUOTA)
+    report = rotate.rotate_many(secret_ids, backend=wrap(inner),
+                                max_workers=workers)
+    print(f"{name:<16}{len(report.succeeded):>6} ok{len(report.failed):>6} "
+          f"failed{report.throughput:>9.1f} rotations/s"
+          f"{inner.calls:>8} calls{inner.throttled:>8} throttled")
+
+
+def main(secrets=2000, workers=64):
+    rotate.log.level = ERROR
+    run("retries only", lambda inner: ResilientBackend(
+        inner, endpoint="retries"), secrets, workers)
+    run("rate limited", lambda inner: ResilientBackend(
+        RateLimitedBackend(
+            inner, RateLimiter({operation: QUOTA for operation in OPERATIONS})),
+        endpoint="limited"), secrets, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Rotation latency of one secret replicated to 1, 2, 4 and 8 regions, every
+backend call taking 20ms and every regional service call 30ms: the regions'
+setSecret and testSecret work done one region after the other, and fanned
+out concurrently.
+
+    python -m benchmarks.bench_regions
+"""
+
+import statistics
+import time
+
+from sample import rotate
+from sample.regions import RegionFanOut
+
+from .slow_backend import SlowBackend
+
+REGIONS = ["us-east-1", "us-west-2", "eu-west-1", "eu-central-1",
+           "ap-southeast-2", "ap-northeast-1", "sa-east-1", "ca-central-1"]
+
+
+class Replica:
+    def __init__(self, primary, latency):
+        self.primary = primary
+        self.latency = latency
+
+    def get_secret_value(self, **kwargs):
+        time.sleep(self.latency)
+        return self.primary.get_secret_value(**kwargs)
+
+
+class RegionalService:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def set_password(self, *, SecretId, Password):
+        time.sleep(self.latency)
+
+    def test_password(self, *, SecretId, Password):
+        time.sleep(self.latency)
+        return True
+
+
+class Sequential(RegionFanOut):
+    def _run(self, step, work):
+        for region in self.regions:
+            start = time.perf_counter()
+            work(region)
+            self.timings[region] = time.perf_counter() - start
+
+
+def run(name, fan_out_class, count, backend, runs=5):
+    regions = REGIONS[:count]
+    rotate.regions = fan_out_class(
+        regions,
+        backends={region: Replica(backend, 0.02) for region in regions},
+        connectors={region: RegionalService(0.03) for region in regions})
+    samples = []
+    for _ in range(runs):
+        result = rotate.rotate_secret("db", backend=backend)
+        assert result.ok, result.error
+        samples.append(result.elapsed)
+    rotate.regions = None
+    print(f"{name:<12}{count:>3} regions"
+          f"{statistics.median(samples) * 1000:>10.1f} ms")
+
+
+def main():
+    backend = SlowBackend(latency=0.02)
+    backend.create_secret(Name="db", SecretString="initial")
+    for count in (1, 2, 4, 8):
+        run("sequential", Sequential, count, backend)
+        run("concurrent", RegionFanOut, count, backend)
+
+
+if __name__ == "__main__":
+    main()
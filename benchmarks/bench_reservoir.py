@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+createSecret latency generating the value on demand versus taking it from a
+pre-filled reservoir, for passwords and, with the cryptography package, key
+pairs. The backend is in-memory so the put costs next to nothing and what is
+left is generation.
+
+    python -m benchmarks.bench_reservoir
+"""
+
+import importlib.util
+import statistics
+import time
+
+from sample import keys, rotate
+from sample.backends import InMemoryBackend
+from sample.logs import ERROR
+
+CASES = [(keys.PASSWORD, 200)]
+if importlib.util.find_spec("cryptography") is not None:
+    CASES += [(keys.ED25519, 200), (keys.RSA, 8)]
+
+
+def create_latency(secret_type, count):
+    backend = InMemoryBackend()
+    backend.create_secret(Name="bench", SecretString="seed")
+    samples = []
+    for i in range(count):
+        event = {"Step": "createSecret", "SecretId": "bench",
+                 "ClientRequestToken": f"v{i}", "SecretType": secret_type}
+        start = time.perf_counter()
+        rotate.handle_event(event, None, backend=backend)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    rotate.log.level = ERROR
+    for secret_type, count in CASES:
+        on_demand = create_latency(secret_type, count)
+        reservoir = rotate.enable_reservoir(secret_type, size=count)
+        reservoir.wait_full()
+        reserved = create_latency(secret_type, count)
+        print(f"{secret_type:<10}{on_demand * 1e6:>12.1f} us on demand"
+              f"{reserved * 1e6:>12.1f} us from reservoir"
+              f"{reservoir.hits:>6} hits{reservoir.misses:>4} misses")
+        rotate.disable_reservoirs()
+    keys.shutdown_key_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation under throttling: no retries, immediate retries, and the
+decorrelated-jitter retry layer with its default policy, budget and circuit
+breaker. The backend enforces a per-operation quota of 500 requests per
+second, get_secret_value is called twice per rotation so the best sustained
+rate is 250 rotations per second.
+
+    python -m benchmarks.bench_retries
+"""
+
+from sample import rotate
+from sample.logs import ERROR
+from sample.resilience import (CircuitBreaker, ResilientBackend, RetryBudget,
+                               RetryPolicy)
+
+from .slow_backend import ThrottlingBackend, seeded
+
+
+def run(name, wrap, secrets, workers):
+    inner, secret_ids = seeded(secrets, backend_class=ThrottlingBackend)
+    report = rotate.rotate_many(secret_ids, backend=wrap(inner),
+                                max_workers=workers)
+    print(f"{name:<16}{len(report.succeeded):>6} ok{len(report.failed):>6} "
+          f"failed{report.throughput:>9.1f} rotations/s"
+          f"{inner.calls:>8} calls{inner.throttled:>8} throttled")
+
+
+def main(secrets=1000, workers=64):
+    rotate.log.level = ERROR
+    run("no retries", lambda inner: inner, secrets, workers)
+    run("immediate retry", lambda inner: ResilientBackend(
+        inner, endpoint="immediate",
+        policy=RetryPolicy(max_attempts=50, base_delay=0, max_delay=0),
+        breaker=CircuitBreaker(failure_threshold=10 ** 9),
+        budget=RetryBudget(ratio=100, min_per_second=10 ** 6)),
+        secrets, workers)
+    run("jitter+budget", lambda inner: ResilientBackend(
+        inner, endpoint="jitter"), secrets, workers)
+
+
+if __name__ == "__main__":
+    main()
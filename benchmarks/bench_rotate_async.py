@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation throughput of `rotate_many_async` for several concurrency
+limits against a coroutine backend with 5ms simulated round trips.
+
+    python -m benchmarks.bench_rotate_async
+"""
+
+import asyncio
+import contextlib
+import io
+
+from sample import rotate
+
+from .slow_backend import seeded_async
+
+
+def main(secrets=10_000, limits=(100, 1000, 5000)):
+    for limit in limits:
+        backend, secret_ids = seeded_async(secrets)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = asyncio.run(rotate.rotate_many_async(
+                secret_ids, backend=backend, concurrency=limit))
+        print(f"concurrency={limit:<5} {report!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+bulk rotation throughput of `rotate_many` for several pool sizes against a
+backend with 5ms simulated round trips.
+
+    python -m benchmarks.bench_rotate_many
+"""
+
+import contextlib
+import io
+
+from sample import rotate
+
+from .slow_backend import seeded
+
+
+def main(secrets=1000, worker_counts=(1, 8, 32, 128)):
+    for workers in worker_counts:
+        backend, secret_ids = seeded(secrets)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = rotate.rotate_many(secret_ids, backend=backend,
+                                        max_workers=workers)
+        print(f"workers={workers:<4} {report!r}")
+
+
+if __name__ == "__main__":
+    main()
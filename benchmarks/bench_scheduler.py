@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+scheduling cost and load smoothing for an inventory of secrets that were all
+created at the same time with one of three rotation intervals. Reports the
+cost per add and per popped secret, minute-by-minute polling included, and
+the busiest minute of rotations with and without the smoothing window.
+
+    python -m benchmarks.bench_scheduler
+"""
+
+import time
+
+from sample.scheduler import RotationScheduler
+
+DAY = 86400.0
+INTERVALS = (30 * DAY, 60 * DAY, 90 * DAY)
+
+
+def run(name, secrets, window):
+    scheduler = RotationScheduler(window=window, clock=lambda: 0.0)
+    start = time.perf_counter()
+    for i in range(secrets):
+        scheduler.add(f"secret-{i}", INTERVALS[i % 3], last_rotated=0.0)
+    add_us = (time.perf_counter() - start) / secrets * 1e6
+
+    start = time.perf_counter()
+    busiest = popped = 0
+    minute = 29 * DAY
+    while popped < secrets:
+        due = len(scheduler.pop_due(minute))
+        busiest = max(busiest, due)
+        popped += due
+        minute += 60
+    pop_us = (time.perf_counter() - start) / secrets * 1e6
+    print(f"{name:<16}{secrets:>8} secrets{add_us:>8.2f} us/add"
+          f"{pop_us:>8.2f} us/pop{busiest:>8} in busiest minute")
+
+
+def main():
+    for secrets in (10000, 50000):
+        run("no smoothing", secrets, window=0)
+        run("1 day window", secrets, window=DAY)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+testSecret verification against a service with 9 replicas, each answering
+in 20ms, one straggler taking 500ms: probing them one after the other,
+concurrently waiting for all of them, and concurrently with a quorum of 5.
+
+    python -m benchmarks.bench_verification
+"""
+
+import statistics
+import time
+
+from sample.connectors import ReplicatedConnector
+
+
+class Replica:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def test_password(self, *, SecretId, Password):
+        time.sleep(self.delay)
+        return True
+
+
+class Sequential(ReplicatedConnector):
+    def test_password(self, *, SecretId, Password):
+        return all(endpoint.test_password(SecretId=SecretId,
+                                          Password=Password)
+                   for endpoint in self.endpoints)
+
+
+def run(name, connector, runs=10):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        connector.test_password(SecretId="db", Password="new")
+        samples.append(time.perf_counter() - start)
+    print(f"{name:<16}{statistics.median(samples) * 1000:>8.1f} ms")
+
+
+def main():
+    replicas = [Replica(0.02) for _ in range(8)] + [Replica(0.5)]
+    run("sequential", Sequential(replicas))
+    run("concurrent, all", ReplicatedConnector(replicas))
+    run("quorum of 5", ReplicatedConnector(replicas, quorum=5))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+backend calls and latency per full rotation with and without the version
+cache, against a backend with 5ms simulated round trips.
+
+    python -m benchmarks.bench_version_cache
+"""
+
+import contextlib
+import io
+import time
+
+from sample import rotate
+from sample.backends import CachingBackend, VersionCache
+
+from .slow_backend import SlowBackend
+
+
+class CountingSlowBackend(SlowBackend):
+    calls = 0
+
+    def put_secret_value(self, **kwargs):
+        self.calls += 1
+        return super().put_secret_value(**kwargs)
+
+    def get_secret_value(self, **kwargs):
+        self.calls += 1
+        return super().get_secret_value(**kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        self.calls += 1
+        return super().list_secret_version_ids(**kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        self.calls += 1
+        return super().update_secret_version_stage(**kwargs)
+
+
+def run(secrets, cached):
+    inner = CountingSlowBackend()
+    for i in range(secrets):
+        inner.create_secret(Name=f"secret-{i}", SecretString="seed")
+    backend = CachingBackend(inner, VersionCache()) if cached else inner
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(secrets):
+            rotate.rotate_secret(f"secret-{i}", backend=backend)
+    elapsed = time.perf_counter() - start
+    return inner.calls / secrets, elapsed / secrets
+
+
+def main(secrets=200):
+    for cached in (False, True):
+        calls, latency = run(secrets, cached)
+        label = "cached" if cached else "uncached"
+        print(f"{label:<10}{calls:>5.1f} calls/rotation "
+              f"{latency * 1e3:>8.2f} ms/rotation")
+
+
+if __name__ == "__main__":
+    main()
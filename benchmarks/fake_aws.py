@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+network-free Secrets Manager responses for benchmarking against real boto3
+clients. A `before-send` handler short-circuits the HTTP request and hands
+botocore a canned response, so request serialisation, response parsing and
+client construction are all still measured.
+"""
+
+import json
+import uuid
+
+import boto3
+from botocore.awsrequest import AWSResponse
+
+from sample.resilience import endpoint_rate_limiter
+
+# version IDs are validated like tokens, 32 characters at least
+CURRENT_VERSION = str(uuid.UUID(int=0))
+
+
+class _Raw:
+    def __init__(self, body):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+def _fake_send(request, **kwargs):
+    operation = request.headers["X-Amz-Target"].decode().split(".")[-1]
+    params = json.loads(request.body or b"{}")
+    secret_id = params.get("SecretId", "bench")
+
+    if operation == "PutSecretValue":
+        body = {"ARN": secret_id, "Name": secret_id,
+                "VersionId": params["ClientRequestToken"],
+                "VersionStages": params.get("VersionStages", [])}
+    elif operation == "GetSecretValue":
+        # asked for by ID, the version is the pending one being rotated to
+        pending = "VersionId" in params
+        body = {"ARN": secret_id, "Name": secret_id,
+                "VersionId": params.get("VersionId", CURRENT_VERSION),
+                "SecretString": "x" * 32,
+                "VersionStages": ["AWSPENDING" if pending else "AWSCURRENT"]}
+    elif operation == "ListSecretVersionIds":
+        body = {"ARN": secret_id, "Name": secret_id,
+                "Versions": [{"VersionId": CURRENT_VERSION,
+                              "VersionStages": ["AWSCURRENT"]}]}
+    else:
+        body = {"ARN": secret_id, "Name": secret_id}
+
+    return AWSResponse(request.url, 200, {}, _Raw(json.dumps(body).encode()))
+
+
+def install(region_name="us-east-1"):
+    """
+    sets up the boto3 default session so every client created from it answers
+    Secrets Manager calls locally, and lifts the rate limits of its endpoint:
+    the fake answers in microseconds, pacing writes at the real quota of 50
+    per second would hide everything else.
+    """
+
+    boto3.setup_default_session(
+        region_name=region_name,
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench",
+    )
+    boto3.DEFAULT_SESSION.events.register(
+        "before-send.secrets-manager", _fake_send)
+    endpoint = boto3.client("secretsmanager").meta.endpoint_url
+    endpoint_rate_limiter(endpoint).buckets.clear()
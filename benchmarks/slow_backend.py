@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+in-memory backend with a fixed per-call delay, standing in for the network
+round trip to Secrets Manager.
+"""
+
+import asyncio
+import threading
+import time
+
+from sample.backends import InMemoryBackend, SecretsBackendError
+
+
+class SlowBackend(InMemoryBackend):
+    def __init__(self, latency=0.005):
+        super().__init__()
+        self.latency = latency
+
+    def put_secret_value(self, **kwargs):
+        time.sleep(self.latency)
+        return super().put_secret_value(**kwargs)
+
+    def get_secret_value(self, **kwargs):
+        time.sleep(self.latency)
+        return super().get_secret_value(**kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        time.sleep(self.latency)
+        return super().list_secret_version_ids(**kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        time.sleep(self.latency)
+        return super().update_secret_version_stage(**kwargs)
+
+
+class ThrottlingBackend(SlowBackend):
+    """
+    slow backend enforcing a per-operation request quota like the service
+    does, calls over quota fail with ThrottlingException.
+    """
+
+    def __init__(self, latency=0.005, quota=500.0):
+        super().__init__(latency)
+        self.quota = quota
+        self.calls = 0
+        self.throttled = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _admit(self, operation):
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            tokens, updated = self._buckets.get(operation, (self.quota, now))
+            tokens = min(self.quota, tokens + (now - updated) * self.quota)
+            if tokens < 1:
+                self._buckets[operation] = (tokens, now)
+                self.throttled += 1
+                return False
+            self._buckets[operation] = (tokens - 1, now)
+            return True
+
+    def _throttle(self, operation):
+        if not self._admit(operation):
+            time.sleep(self.latency)
+            raise SecretsBackendError("ThrottlingException", operation)
+
+    def put_secret_value(self, **kwargs):
+        self._throttle("put_secret_value")
+        return super().put_secret_value(**kwargs)
+
+    def get_secret_value(self, **kwargs):
+        self._throttle("get_secret_value")
+        return super().get_secret_value(**kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        self._throttle("list_secret_version_ids")
+        return super().list_secret_version_ids(**kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        self._throttle("update_secret_version_stage")
+        return super().update_secret_version_stage(**kwargs)
+
+
+def seeded(count, latency=0.005, backend_class=SlowBackend, **kwargs):
+    backend = backend_class(latency, **kwargs)
+    for i in range(count):
+        backend.create_secret(Name=f"secret-{i}", SecretString="seed")
+    return backend, [f"secret-{i}" for i in range(count)]
+
+
+class AsyncSlowBackend:
+    """
+    coroutine backend over `InMemoryBackend`, the delay is an `asyncio.sleep`
+    so thousands of calls can wait concurrently.
+    """
+
+    def __init__(self, latency=0.005):
+        self.backend = InMemoryBackend()
+        self.latency = latency
+
+    async def _call(self, operation, kwargs):
+        await asyncio.sleep(self.latency)
+        return getattr(self.backend, operation)(**kwargs)
+
+    async def put_secret_value(self, **kwargs):
+        return await self._call("put_secret_value", kwargs)
+
+    async def get_secret_value(self, **kwargs):
+        return await self._call("get_secret_value", kwargs)
+
+    async def list_secret_version_ids(self, **kwargs):
+        return await self._call("list_secret_version_ids", kwargs)
+
+    async def update_secret_version_stage(self, **kwargs):
+        return await self._call("update_secret_version_stage", kwargs)
+
+
+def seeded_async(count, latency=0.005):
+    backend = AsyncSlowBackend(latency)
+    for i in range(count):
+        backend.backend.create_secret(Name=f"secret-{i}", SecretString="seed")
+    return backend, [f"secret-{i}" for i in range(count)]
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for regression tracking between commits. It drives
+`handle_event` through full rotations and `generate_password` against an
+`InMemoryBackend`, so it measures our code and not the network, and
+reports:
+
+- ops/s and p50/p99 latency of each rotation step, of a whole rotation and
+  of password generation
+- memory per operation under tracemalloc, in a separate pass because
+  tracing slows everything down: the peak transient allocation, and the
+  bytes still held afterwards, for a rotation mostly the version the
+  backend now stores
+- cold start against warm: a fresh interpreter's import of `sample.rotate`
+  and its first rotation, then a second rotation in the same process
+
+Results are written as JSON. Comparing against a baseline flags every metric
+that got worse by more than the threshold, and exits 1 if any did.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+    python -m benchmarks.suite --quick
+
+`make bench` saves results under benchmarks/results/ named after the commit,
+and `make bench-compare BASELINE=<file>` compares against one of them.
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from sample import rotate
+from sample.backends import InMemoryBackend
+from sample.passwords import generate_password
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STEPS = rotate.ROTATION_STEPS
+
+# metrics where a larger value is better, every other one is a cost
+HIGHER_IS_BETTER = frozenset(("ops_per_sec",))
+
+# run in a fresh interpreter for the cold start figures, it prints them as
+# JSON on the last line
+COLD_START_SCRIPT = """
+import contextlib, json, os, time
+start = time.perf_counter()
+from sample import rotate
+from sample.backends import InMemoryBackend
+imported = time.perf_counter()
+
+def rotation(backend, token):
+    start = time.perf_counter()
+    for step in rotate.ROTATION_STEPS:
+        rotate.handle_event({"Step": step, "SecretId": "db",
+                             "ClientRequestToken": token}, None,
+                            backend=backend)
+    return time.perf_counter() - start
+
+with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+    backend = InMemoryBackend()
+    backend.create_secret(Name="db", SecretString="initial")
+    first = rotation(backend, "first")
+    second = rotation(backend, "second")
+    rotate.log.flush()
+print(json.dumps({"import_ms": (imported - start) * 1000,
+                  "first_rotation_ms": first * 1000,
+                  "warm_rotation_ms": second * 1000}))
+"""
+
+
+def percentile(samples, q):
+    """
+    `q` percentile (0-100) of `samples`, nearest rank.
+    """
+
+    ordered = sorted(samples)
+    rank = max(int(round(q / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarise(samples):
+    """
+    ops/s and latency percentiles, in microseconds, of per-operation
+    durations in seconds.
+    """
+
+    return {
+        "ops_per_sec": len(samples) / sum(samples),
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    # the rotation logs stay on, they are part of the cost of a step, but
+    # their lines go nowhere
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        try:
+            yield
+        finally:
+            rotate.log.flush()
+
+
+def seeded_backend(secrets):
+    backend = InMemoryBackend()
+    for i in range(secrets):
+        backend.create_secret(Name=f"secret-{i}", SecretString="initial")
+    return backend
+
+
+def rotate_once(backend, secret_id, token, timings=None):
+    for step in STEPS:
+        start = time.perf_counter()
+        rotate.handle_event({"Step": step, "SecretId": secret_id,
+                             "ClientRequestToken": token}, None,
+                            backend=backend)
+        if timings is not None:
+            timings[step].append(time.perf_counter() - start)
+
+
+def bench_rotation(rotations):
+    """
+    per-step and whole-rotation latency, each rotation on its own secret
+    like a fleet of secrets rotated once.
+    """
+
+    backend = seeded_backend(rotations)
+    timings = {step: [] for step in STEPS}
+    with quiet():
+        # warms up the password pool, the caches and the log writer
+        rotate_once(seeded_backend(1), "secret-0", "warm-up")
+        for i in range(rotations):
+            rotate_once(backend, f"secret-{i}", "next", timings)
+
+    results = {f"step.{step}": summarise(samples)
+               for step, samples in timings.items()}
+    results["rotation"] = summarise(
+        [sum(step_times) for step_times in zip(*timings.values())])
+    return results
+
+
+def bench_generate_password(count):
+    generate_password(32)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        generate_password(32)
+        samples.append(time.perf_counter() - start)
+    return {"generate_password": summarise(samples)}
+
+
+def allocations(operation, count):
+    """
+    peak bytes allocated while one `operation` runs, the median over `count`
+    runs so an occasional dict resize or pool refill does not swamp it, and
+    bytes still allocated per run once all are done.
+    """
+
+    operation(-1)
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        peaks = []
+        for i in range(count):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            operation(i)
+            _, run_peak = tracemalloc.get_traced_memory()
+            peaks.append(run_peak - before)
+        # queued log records are not retained, they are waiting for the
+        # writer thread
+        rotate.log.flush()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_bytes": percentile(peaks, 50),
+            "alloc_retained_bytes": (retained - baseline) / count}
+
+
+def bench_allocations(count):
+    backend = seeded_backend(count + 1)
+
+    def rotation(i):
+        rotate_once(backend, f"secret-{i + 1}", "next")
+
+    with quiet():
+        rotation_allocs = allocations(rotation, count)
+    password_allocs = allocations(lambda i: generate_password(32), count)
+    return {"rotation": rotation_allocs, "generate_password": password_allocs}
+
+
+def bench_cold_start(processes):
+    """
+    median import, first and second rotation times over `processes` fresh
+    interpreters.
+    """
+
+    runs = []
+    for _ in range(processes):
+        proc = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT],
+                              cwd=ROOT, capture_output=True, text=True,
+                              check=True)
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {"cold_start": {key: percentile([run[key] for run in runs], 50)
+                           for key in runs[0]}}
+
+
+def git_commit():
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=ROOT, capture_output=True, text=True,
+                              check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip()
+
+
+def run_suite(rotations=20_000, passwords=100_000, allocation_runs=500,
+              processes=5):
+    benchmarks = {}
+    for name, metrics in bench_rotation(rotations).items():
+        benchmarks.setdefault(name, {}).update(metrics)
+    benchmarks.update(bench_generate_password(passwords))
+    for name, metrics in bench_allocations(allocation_runs).items():
+        benchmarks[name].update(metrics)
+    benchmarks.update(bench_cold_start(processes))
+    return {
+        "commit": git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": benchmarks,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    relative change of every metric both results have, as rows of
+    `(benchmark, metric, old, new, change, regressed)`. `change` is
+    positive when the metric got worse.
+    """
+
+    rows = []
+    for name, metrics in sorted(current["benchmarks"].items()):
+        old_metrics = baseline["benchmarks"].get(name, {})
+        for metric, new in sorted(metrics.items()):
+            old = old_metrics.get(metric)
+            if old is None:
+                continue
+            if old == 0:
+                change = 0.0 if new == 0 else float("inf")
+            else:
+                change = (new - old) / abs(old)
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            rows.append((name, metric, old, new, change, change > threshold))
+    return rows
+
+
+def print_results(results):
+    print(f"commit {results['commit']}, Python {results['python']}")
+    for name, metrics in sorted(results["benchmarks"].items()):
+        print(name)
+        for metric, value in sorted(metrics.items()):
+            print(f"  {metric:<24}{value:>16,.1f}")
+
+
+def print_comparison(rows, threshold):
+    print(f"{'benchmark':<24}{'metric':<24}{'baseline':>14}{'current':>14}"
+          f"{'worse by':>10}")
+    for name, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<24}{metric:<24}{old:>14,.1f}{new:>14,.1f}"
+              f"{change:>10.1%}{flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{regressions} metric(s) worse by more than {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.suite",
+        description="benchmark rotations and password generation")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare with results saved by --output")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change counted as a regression, "
+                             "0.10 by default")
+    parser.add_argument("--quick", action="store_true",
+                        help="fewer iterations, for a smoke run")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        results = run_suite(rotations=1_000, passwords=5_000,
+                            allocation_runs=50, processes=2)
+    else:
+        results = run_suite()
+    print_results(results)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)),
+                    exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+            output.write("\n")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"\ncompared with {args.compare} "
+              f"(commit {baseline.get('commit')})")
+        rows = compare(baseline, results, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""
+Secrets Manager backends used by the rotation steps. The interface mirrors the
+subset of the boto3 Secrets Manager client that rotation needs, same keyword
+arguments and same response shapes, so a boto3 client can be swapped for the
+in-memory implementation when load testing or benchmarking without AWS.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Protocol, Set, Tuple
+
+AWSCURRENT = "AWSCURRENT"
+AWSPENDING = "AWSPENDING"
+AWSPREVIOUS = "AWSPREVIOUS"
+
+
+class SecretsBackendError(RuntimeError):
+    """
+    error raised by any backend, `code` carries the Secrets Manager error code
+    such as ResourceNotFoundException or ThrottlingException.
+    """
+
+    def __init__(self, code: str, message: str = ""):
+        super().__init__(f"{code}: {message}" if message else code)
+        self.code = code
+
+
+class SecretsBackend(Protocol):
+    """
+    the Secrets Manager operations used during rotation.
+    """
+
+    def put_secret_value(self, *, SecretId: str, ClientRequestToken: str,
+                         SecretString: str,
+                         VersionStages: Optional[List[str]] = None) -> dict:
+        ...
+
+    def get_secret_value(self, *, SecretId: str,
+                         VersionId: Optional[str] = None,
+                         VersionStage: Optional[str] = None) -> dict:
+        ...
+
+    def list_secret_version_ids(self, *, SecretId: str,
+                                MaxResults: Optional[int] = None,
+                                NextToken: Optional[str] = None,
+                                IncludeDeprecated: bool = False) -> dict:
+        ...
+
+    def update_secret_version_stage(
+            self, *, SecretId: str, VersionStage: str,
+            MoveToVersionId: Optional[str] = None,
+            RemoveFromVersionId: Optional[str] = None) -> dict:
+        ...
+
+
+class Boto3Backend:
+    """
+    backend delegating to a boto3 Secrets Manager client, botocore client
+    errors are re-raised as `SecretsBackendError`.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def _call(self, operation, kwargs):
+        from botocore.exceptions import ClientError
+
+        try:
+            return getattr(self.client, operation)(**kwargs)
+        except ClientError as exc:
+            error = exc.response.get("Error", {})
+            raise SecretsBackendError(
+                error.get("Code", "Unknown"), error.get("Message", "")
+            ) from exc
+
+    def put_secret_value(self, **kwargs) -> dict:
+        return self._call("put_secret_value", kwargs)
+
+    def get_secret_value(self, **kwargs) -> dict:
+        return self._call("get_secret_value", kwargs)
+
+    def list_secret_version_ids(self, **kwargs) -> dict:
+        return self._call("list_secret_version_ids", kwargs)
+
+    def update_secret_version_stage(self, **kwargs) -> dict:
+        return self._call("update_secret_version_stage", kwargs)
+
+
+class _Secret:
+    __slots__ = ("name", "versions", "stages")
+
+    def __init__(self, name):
+        self.name = name
+        # version ID -> [value, set of stages, created timestamp]
+        self.versions: Dict[str, list] = {}
+        # stage label -> version ID, a label is attached to one version only
+        self.stages: Dict[str, str] = {}
+
+
+class InMemoryBackend:
+    """
+    thread-safe, process-local stand-in for Secrets Manager. Staging labels
+    follow the service rules: a label lives on a single version, moving
+    AWSCURRENT attaches AWSPREVIOUS to the version it was taken from, and
+    versions left without labels are deprecated.
+    """
+
+    def __init__(self):
+        self._secrets: Dict[str, _Secret] = {}
+        self._lock = threading.Lock()
+
+    def create_secret(self, *, Name: str, SecretString: str,
+                      ClientRequestToken: Optional[str] = None) -> dict:
+        """
+        creates a secret with an initial AWSCURRENT version.
+        """
+
+        with self._lock:
+            if Name in self._secrets:
+                raise SecretsBackendError(
+                    "ResourceExistsException", f"secret {Name} exists")
+            secret = self._secrets[Name] = _Secret(Name)
+            version_id = ClientRequestToken or str(uuid.uuid4())
+            self._add_version(secret, version_id, SecretString, [AWSCURRENT])
+        return {"ARN": Name, "Name": Name, "VersionId": version_id}
+
+    def _get(self, secret_id) -> _Secret:
+        secret = self._secrets.get(secret_id)
+        if secret is None:
+            raise SecretsBackendError(
+                "ResourceNotFoundException", f"secret {secret_id} not found")
+        return secret
+
+    def _attach(self, secret, stage, version_id):
+        previous = secret.stages.get(stage)
+        if previous == version_id:
+            return
+        if previous is not None:
+            secret.versions[previous][1].discard(stage)
+            if stage == AWSCURRENT:
+                self._attach(secret, AWSPREVIOUS, previous)
+        secret.stages[stage] = version_id
+        secret.versions[version_id][1].add(stage)
+
+    def _add_version(self, secret, version_id, value, stages):
+        secret.versions[version_id] = [value, set(), time.time()]
+        for stage in stages:
+            self._attach(secret, stage, version_id)
+
+    def put_secret_value(self, *, SecretId: str, ClientRequestToken: str,
+                         SecretString: str,
+                         VersionStages: Optional[List[str]] = None) -> dict:
+        with self._lock:
+            secret = self._get(SecretId)
+            version = secret.versions.get(ClientRequestToken)
+            if version is not None:
+                # same token and same value is an idempotent retry
+                if version[0] != SecretString:
+                    raise SecretsBackendError(
+                        "ResourceExistsException",
+                        f"version {ClientRequestToken} exists with another "
+                        "value")
+            else:
+                self._add_version(secret, ClientRequestToken, SecretString,
+                                  VersionStages or [AWSCURRENT])
+            stages = sorted(secret.versions[ClientRequestToken][1])
+        return {"ARN": SecretId, "Name": SecretId,
+                "VersionId": ClientRequestToken, "VersionStages": stages}
+
+    def get_secret_value(self, *, SecretId: str,
+                         VersionId: Optional[str] = None,
+                         VersionStage: Optional[str] = None) -> dict:
+        with self._lock:
+            secret = self._get(SecretId)
+            if VersionId is None:
+                VersionId = secret.stages.get(VersionStage or AWSCURRENT)
+            version = secret.versions.get(VersionId)
+            if version is None or (
+                    VersionStage is not None and VersionStage not in version[1]):
+                raise SecretsBackendError(
+                    "ResourceNotFoundException",
+                    f"version {VersionId} of {SecretId} not found")
+            stages = sorted(version[1])
+        return {"ARN": SecretId, "Name": SecretId, "VersionId": VersionId,
+                "SecretString": version[0], "VersionStages": stages,
+                "CreatedDate": version[2]}
+
+    def list_secret_version_ids(self, *, SecretId: str,
+                                MaxResults: Optional[int] = None,
+                                NextToken: Optional[str] = None,
+                                IncludeDeprecated: bool = False) -> dict:
+        start = int(NextToken or 0)
+        versions = []
+        with self._lock:
+            secret = self._get(SecretId)
+            # the token is a position in the version history, so each page
+            # only walks the versions it returns
+            position = start
+            for version_id, (_, stages, created) in itertools.islice(
+                    secret.versions.items(), start, None):
+                if MaxResults is not None and len(versions) == MaxResults:
+                    break
+                position += 1
+                if stages or IncludeDeprecated:
+                    versions.append(
+                        {"VersionId": version_id,
+                         "VersionStages": sorted(stages),
+                         "CreatedDate": created})
+            more = position < len(secret.versions)
+
+        response = {"ARN": SecretId, "Name": SecretId, "Versions": versions}
+        if more:
+            response["NextToken"] = str(position)
+        return response
+
+    def update_secret_version_stage(
+            self, *, SecretId: str, VersionStage: str,
+            MoveToVersionId: Optional[str] = None,
+            RemoveFromVersionId: Optional[str] = None) -> dict:
+        with self._lock:
+            secret = self._get(SecretId)
+            attached = secret.stages.get(VersionStage)
+            if attached is not None and attached != MoveToVersionId \
+                    and attached != RemoveFromVersionId:
+                raise SecretsBackendError(
+                    "InvalidParameterException",
+                    f"{VersionStage} is attached to {attached}, specify it "
+                    "as RemoveFromVersionId")
+            for version_id in (MoveToVersionId, RemoveFromVersionId):
+                if version_id is not None and version_id not in secret.versions:
+                    raise SecretsBackendError(
+                        "ResourceNotFoundException",
+                        f"version {version_id} of {SecretId} not found")
+
+            if MoveToVersionId is not None:
+                self._attach(secret, VersionStage, MoveToVersionId)
+            elif RemoveFromVersionId is not None and attached is not None:
+                secret.versions[attached][1].discard(VersionStage)
+                del secret.stages[VersionStage]
+        return {"ARN": SecretId, "Name": SecretId}
+
+
+class VersionCache:
+    """
+    thread-safe LRU cache of secret versions keyed by secret and version ID.
+    Entries expire `ttl` seconds after being stored and the least recently
+    used entry is evicted beyond `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = \
+            OrderedDict()
+        self._by_secret: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, secret_id: str, version_id: str) -> Optional[dict]:
+        key = (secret_id, version_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, secret_id: str, version_id: str, value: dict):
+        key = (secret_id, version_id)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._by_secret.setdefault(secret_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, secret_id: str):
+        """
+        drops every cached version of `secret_id`.
+        """
+
+        with self._lock:
+            for key in self._by_secret.pop(secret_id, ()):
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_secret.clear()
+
+    def _drop(self, key):
+        del self._entries[key]
+        keys = self._by_secret[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._by_secret[key[0]]
+
+
+class CachingBackend:
+    """
+    read-through cache in front of another backend. Values written with
+    `put_secret_value` are cached straight away, `get_secret_value` by version
+    ID is served from the cache when possible, and any staging label change
+    invalidates the cached versions of that secret. Lookups by stage alone
+    always reach the backend since labels move.
+
+    Works for both blocking and coroutine backends, in front of a coroutine
+    backend a cache hit is returned as is and only misses are awaitable.
+    """
+
+    def __init__(self, backend: SecretsBackend,
+                 cache: Optional[VersionCache] = None):
+        self.backend = backend
+        self.cache = cache if cache is not None else VersionCache()
+
+    def _store_put(self, kwargs, response):
+        self.cache.put(kwargs["SecretId"], kwargs["ClientRequestToken"], {
+            "ARN": response.get("ARN"),
+            "Name": response.get("Name"),
+            "VersionId": kwargs["ClientRequestToken"],
+            "SecretString": kwargs["SecretString"],
+            "VersionStages": response.get(
+                "VersionStages", kwargs.get("VersionStages", [])),
+        })
+        return response
+
+    def put_secret_value(self, **kwargs) -> dict:
+        response = self.backend.put_secret_value(**kwargs)
+        if hasattr(response, "__await__"):
+            return self._put_async(kwargs, response)
+        return self._store_put(kwargs, response)
+
+    async def _put_async(self, kwargs, awaitable):
+        return self._store_put(kwargs, await awaitable)
+
+    def get_secret_value(self, **kwargs) -> dict:
+        version_id = kwargs.get("VersionId")
+        if version_id is None or kwargs.get("VersionStage") is not None:
+            return self.backend.get_secret_value(**kwargs)
+
+        response = self.cache.get(kwargs["SecretId"], version_id)
+        if response is None:
+            response = self.backend.get_secret_value(**kwargs)
+            if hasattr(response, "__await__"):
+                return self._get_async(kwargs["SecretId"], version_id,
+                                       response)
+            self.cache.put(kwargs["SecretId"], version_id, response)
+        return response
+
+    async def _get_async(self, secret_id, version_id, awaitable):
+        response = await awaitable
+        self.cache.put(secret_id, version_id, response)
+        return response
+
+    def list_secret_version_ids(self, **kwargs) -> dict:
+        return self.backend.list_secret_version_ids(**kwargs)
+
+    def update_secret_version_stage(self, **kwargs) -> dict:
+        try:
+            response = self.backend.update_secret_version_stage(**kwargs)
+        except BaseException:
+            self.cache.invalidate(kwargs["SecretId"])
+            raise
+        if hasattr(response, "__await__"):
+            return self._update_async(kwargs["SecretId"], response)
+        self.cache.invalidate(kwargs["SecretId"])
+        return response
+
+    async def _update_async(self, secret_id, awaitable):
+        try:
+            return await awaitable
+        finally:
+            self.cache.invalidate(secret_id)
+
+
+class ThreadedAsyncBackend:
+    """
+    async view of a blocking backend, each call runs on the event loop's
+    default executor so the loop is never blocked by boto3 I/O.
+    """
+
+    def __init__(self, backend: SecretsBackend):
+        self.backend = backend
+
+    async def _call(self, operation, kwargs):
+        import asyncio
+        import functools
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(getattr(self.backend, operation), **kwargs))
+
+    async def put_secret_value(self, **kwargs) -> dict:
+        return await self._call("put_secret_value", kwargs)
+
+    async def get_secret_value(self, **kwargs) -> dict:
+        return await self._call("get_secret_value", kwargs)
+
+    async def list_secret_version_ids(self, **kwargs) -> dict:
+        return await self._call("list_secret_version_ids", kwargs)
+
+    async def update_secret_version_stage(self, **kwargs) -> dict:
+        return await self._call("update_secret_version_stage", kwargs)
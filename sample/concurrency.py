@@ -0,0 +1,123 @@
+"""
+Adaptive concurrency for bulk rotation. Instead of a fixed worker count the
+number of rotations in flight follows an AIMD controller: it grows by one per
+window of successful rotations and is cut multiplicatively when rotations get
+throttled or their latency spikes, the same way TCP finds the capacity of a
+link it knows nothing about.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from .resilience import THROTTLING_CODES
+
+# error codes telling the controller to back off, an open circuit means the
+# endpoint is overloaded as much as throttling does
+OVERLOAD_CODES = THROTTLING_CODES | frozenset(("CircuitOpen",))
+
+
+class AIMDLimit:
+    """
+    concurrency limit between `min_limit` and `max_limit`, starting at
+    `initial`. Every completion is reported with `record`: a success adds
+    `increase / limit`, so the limit grows by `increase` per window of
+    completions, an overload error or a latency above `latency_tolerance`
+    times the smoothed latency multiplies it by `backoff`. After a decrease
+    further signals are ignored until the window in flight at the time has
+    completed, one burst of throttling only counts once.
+
+    `throughput` is the completion rate over the last `window` seconds. With
+    `metrics` both are published as gauges under ("Bulk", `name`).
+    """
+
+    def __init__(self, initial: int = 8, min_limit: int = 1,
+                 max_limit: int = 256, increase: float = 1.0,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0,
+                 smoothing: float = 0.05, window: float = 10.0,
+                 metrics=None, name: str = "rotate_many",
+                 clock: Callable[[], float] = time.monotonic):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError("need 1 <= min_limit <= initial <= max_limit")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.window = window
+        self.metrics = metrics
+        self.name = name
+        self.clock = clock
+        self.latency: Optional[float] = None
+        self.decreases = 0
+        self._limit = float(initial)
+        self._cooldown = 0
+        self._completions = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def record(self, latency: float,
+               error: Optional[BaseException] = None):
+        """
+        reports one completion that took `latency` seconds, `error` is the
+        exception it failed with, if any.
+        """
+
+        overloaded = getattr(error, "code", None) in OVERLOAD_CODES
+        with self._lock:
+            now = self.clock()
+            self._completions.append(now)
+            self._expire(now)
+            # a spike is judged against the latency before this sample
+            spike = (error is None and self.latency is not None
+                     and latency > self.latency_tolerance * self.latency)
+            if error is None:
+                self.latency = latency if self.latency is None else (
+                    self.latency + self.smoothing * (latency - self.latency))
+
+            if self._cooldown:
+                self._cooldown -= 1
+            elif overloaded or spike:
+                self._cooldown = self.limit - 1
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self.decreases += 1
+            elif error is None:
+                self._limit = min(self.max_limit,
+                                  self._limit + self.increase / self._limit)
+            limit = self.limit
+
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.gauge("Bulk", self.name, "ConcurrencyLimit", limit)
+            self.metrics.gauge("Bulk", self.name, "RotationsPerSecond",
+                               round(self.throughput(), 3))
+
+    def throughput(self) -> float:
+        """
+        completions per second over the last `window` seconds.
+        """
+
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            count = len(self._completions)
+            if not count:
+                return 0.0
+            # until a whole window has passed, rate over the time actually seen
+            span = min(self.window, now - self._completions[0]) or self.window
+            return count / span
+
+    def _expire(self, now):
+        while self._completions and \
+                self._completions[0] <= now - self.window:
+            self._completions.popleft()
+
+    def __repr__(self):
+        return (f"<AIMDLimit limit={self.limit} "
+                f"latency={self.latency} decreases={self.decreases}>")
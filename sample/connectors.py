@@ -0,0 +1,359 @@
+"""
+Connectors apply a rotated secret to the service it belongs to. setSecret
+hands the pending value to `set_password` and testSecret checks it with
+`test_password`. The HTTP connector keeps a pool of keep-alive connections
+per target host, shared by every connector in the process, so rotating many
+users of one cluster reuses a handful of connections instead of opening a TCP
+connection and a TLS session per call. `ReplicatedConnector` checks a new
+password against every replica of a service at once.
+"""
+
+import base64
+import http.client
+import json
+import ssl
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Protocol, Sequence, Tuple
+from urllib.parse import quote, urlsplit
+
+from .logs import get_logger
+
+log = get_logger(__name__)
+
+
+class ConnectorError(RuntimeError):
+    """
+    the remote service rejected a call, `status` is the HTTP status code.
+    """
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"HTTP {status}: {message}" if message
+                         else f"HTTP {status}")
+        self.status = status
+
+
+class Connector(Protocol):
+    """
+    the remote service operations used during rotation.
+    """
+
+    def set_password(self, *, SecretId: str, Password: str) -> None:
+        ...
+
+    def test_password(self, *, SecretId: str, Password: str) -> bool:
+        ...
+
+
+# errors of a connection the server closed while it sat idle in the pool,
+# the request is sent again on a fresh connection
+_STALE_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError,
+                 ConnectionResetError, ConnectionAbortedError)
+
+
+class ConnectionPool:
+    """
+    keep-alive connections to one `scheme://host:port`. Up to `maxsize`
+    idle connections are kept, most recently used first, so a burst of
+    requests finds warm connections and the surplus ones age out.
+    """
+
+    def __init__(self, scheme: str, host: str, port: Optional[int] = None,
+                 maxsize: int = 8, timeout: float = 5.0,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        if scheme not in ("http", "https"):
+            raise ValueError(f"unsupported scheme {scheme!r}")
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.opened = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.opened += 1
+        if self.scheme == "https":
+            context = self.ssl_context or _default_ssl_context()
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout, context=context)
+        return http.client.HTTPConnection(self.host, self.port,
+                                          timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None
+                ) -> Tuple[int, bytes]:
+        """
+        sends one request and returns the status and the whole body, the
+        connection goes back to the pool unless the server closes it.
+        """
+
+        headers = dict(headers or {})
+        while True:
+            try:
+                connection, reused = self._idle.pop(), True
+            except IndexError:
+                connection, reused = self._connect(), False
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except _STALE_ERRORS:
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, data
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+_ssl_context = None
+_pools: Dict[Tuple[str, str, Optional[int]], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _default_ssl_context() -> ssl.SSLContext:
+    global _ssl_context
+
+    # building a context loads the CA bundle, do it once
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def connection_pool(url: str, maxsize: int = 8,
+                    timeout: float = 5.0) -> ConnectionPool:
+    """
+    the pool shared by every caller of the host `url` points at, created
+    with `maxsize` and `timeout` on first use.
+    """
+
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.hostname, parts.port)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    parts.scheme, parts.hostname, parts.port, maxsize,
+                    timeout)
+    return pool
+
+
+def close_connection_pools():
+    """
+    closes and forgets every shared pool.
+    """
+
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def _basic_auth(username: str, password: str) -> str:
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    return f"Basic {token}"
+
+
+class ElasticsearchConnector:
+    """
+    changes passwords of Elasticsearch native users through
+    `POST /_security/user/<username>/_password`, authenticated as `auth`, a
+    `(username, password)` pair or a callable returning one. `username` maps
+    the secret ID to the user whose password it holds, the secret ID itself
+    by default. `test_password` authenticates as that user with the new
+    password.
+    """
+
+    def __init__(self, url: str,
+                 auth=None,
+                 username: Optional[Callable[[str], str]] = None,
+                 pool: Optional[ConnectionPool] = None):
+        self.url = url.rstrip("/")
+        self.base_path = urlsplit(self.url).path
+        self.auth = auth
+        self.username = username or (lambda secret_id: secret_id)
+        self.pool = pool or connection_pool(self.url)
+
+    def _headers(self, auth=None) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        auth = auth or (self.auth() if callable(self.auth) else self.auth)
+        if auth is not None:
+            headers["Authorization"] = _basic_auth(*auth)
+        return headers
+
+    def set_password(self, *, SecretId: str, Password: str) -> None:
+        user = quote(self.username(SecretId), safe="")
+        body = json.dumps({"password": Password}).encode()
+        status, _ = self.pool.request(
+            "POST", f"{self.base_path}/_security/user/{user}/_password",
+            body=body, headers=self._headers())
+        if not 200 <= status < 300:
+            # the response body is not echoed, it may quote the request
+            raise ConnectorError(status, "password change rejected")
+
+    def test_password(self, *, SecretId: str, Password: str) -> bool:
+        user = self.username(SecretId)
+        status, _ = self.pool.request(
+            "GET", f"{self.base_path}/_security/_authenticate",
+            headers=self._headers((user, Password)))
+        if status in (401, 403):
+            return False
+        if not 200 <= status < 300:
+            raise ConnectorError(status, "authentication check failed")
+        return True
+
+
+class ReplicatedConnector:
+    """
+    a service running as several replicas, one connector per replica.
+    `set_password` goes to the first one, which is enough for services that
+    share their user store such as an Elasticsearch cluster. `test_password`
+    probes all replicas concurrently and succeeds once `quorum` of them,
+    all by default, accepted the password. It answers as soon as the outcome
+    is certain: when the quorum is reached, or when too many probes failed
+    for it to be reached.
+
+    A probe that has not answered `probe_timeout` seconds after it started
+    counts as failed, it is not cancelled but its result is ignored. Probes
+    run on a pool of this connector's own, `max_workers` threads, four per
+    replica by default, so concurrent rotations checking the same service
+    queue up there without eating into their timeouts, and a hung replica of
+    one service cannot starve the probes of another. A probe still waiting
+    for a thread after `queue_timeout` seconds, `probe_timeout` by default,
+    counts as failed too, so a call answers within `queue_timeout` plus
+    `probe_timeout` even once hung probes hold every thread.
+    """
+
+    def __init__(self, endpoints: Sequence[Connector],
+                 quorum: Optional[int] = None, probe_timeout: float = 5.0,
+                 max_workers: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        if not endpoints:
+            raise ValueError("need at least one endpoint")
+        quorum = len(endpoints) if quorum is None else quorum
+        if not 1 <= quorum <= len(endpoints):
+            raise ValueError(f"quorum must be between 1 and {len(endpoints)}")
+        self.endpoints = list(endpoints)
+        self.quorum = quorum
+        self.probe_timeout = probe_timeout
+        self.queue_timeout = probe_timeout if queue_timeout is None \
+            else queue_timeout
+        self.max_workers = max_workers or 4 * len(self.endpoints)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _probes(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # imported here, like the thread pool in `rotate_many`
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="sample-probe")
+        return self._executor
+
+    def close(self):
+        """
+        shuts the probe pool down without waiting for probes still running.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def set_password(self, *, SecretId: str, Password: str) -> None:
+        self.endpoints[0].set_password(SecretId=SecretId, Password=Password)
+
+    def test_password(self, *, SecretId: str, Password: str) -> bool:
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        # when each probe started running, a probe still queued behind other
+        # rotations' probes has not used any of its timeout yet
+        started: Dict[int, float] = {}
+
+        def probe(index, endpoint):
+            started[index] = time.monotonic()
+            return endpoint.test_password(SecretId=SecretId,
+                                          Password=Password)
+
+        submitted = time.monotonic()
+        pending = {self._probes().submit(probe, index, endpoint): index
+                   for index, endpoint in enumerate(self.endpoints)}
+        accepted = failed = 0
+        allowed_failures = len(self.endpoints) - self.quorum
+        while pending:
+            # sleep until the earliest deadline, a queued probe's being the
+            # end of its queue allowance
+            now = time.monotonic()
+            deadlines = [started[index] + self.probe_timeout
+                         if index in started
+                         else submitted + self.queue_timeout
+                         for index in pending.values()]
+            done, _ = wait(pending, timeout=max(min(deadlines) - now, 0.0),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    ok = future.result()
+                except Exception as exc:
+                    ok = False
+                    log.warning("replica probe failed", secret_id=SecretId,
+                                endpoint=index, error=repr(exc))
+                if ok:
+                    accepted += 1
+                else:
+                    failed += 1
+
+            now = time.monotonic()
+            expired = [future for future, index in pending.items()
+                       if index in started
+                       and now - started[index] >= self.probe_timeout]
+            if expired:
+                failed += len(expired)
+                log.warning("replicas did not answer in time",
+                            secret_id=SecretId,
+                            endpoints=sorted(pending.pop(future)
+                                             for future in expired))
+            # still queued, most likely behind probes hung on a replica
+            unstarted = [future for future, index in pending.items()
+                         if index not in started
+                         and now - submitted >= self.queue_timeout]
+            if unstarted:
+                failed += len(unstarted)
+                log.warning("replica probes did not start in time",
+                            secret_id=SecretId,
+                            endpoints=sorted(pending.pop(future)
+                                             for future in unstarted))
+            if accepted >= self.quorum or failed > allowed_failures:
+                break
+        return accepted >= self.quorum
@@ -0,0 +1,167 @@
+"""
+Key pair secrets. RSA and Ed25519 keys are generated with the `cryptography`
+package, imported on first use so password-only deployments never load it.
+Generating an RSA key holds the CPU for tens of milliseconds, so rotation
+workers hand it to a process pool shared by the whole process, which scales
+across cores and leaves the worker threads free to wait on the network.
+
+Where processes cannot be started, AWS Lambda has no /dev/shm for the pool's
+semaphores, keys are generated in the calling thread instead.
+"""
+
+import json
+import os
+import threading
+from typing import List, Optional
+
+from .passwords import generate_password, generate_passwords
+
+PASSWORD = "password"
+RSA = "rsa"
+ED25519 = "ed25519"
+KEY_TYPES = (RSA, ED25519)
+# key types worth a trip to the pool for a single key, an Ed25519 key takes
+# less time to generate than to pickle across processes
+POOLED_KEY_TYPES = frozenset((RSA,))
+
+RSA_KEY_SIZE = 3072
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+# set once creating the pool failed, every key is then generated in-process
+_pool_unavailable = False
+
+
+def generate_key_pair(key_type: str = ED25519,
+                      key_size: int = RSA_KEY_SIZE) -> dict:
+    """
+    returns a new key pair as `{"KeyType", "PrivateKey", "PublicKey"}`, the
+    private key as unencrypted PKCS#8 PEM and the public key in OpenSSH
+    format. `key_size` only applies to RSA keys.
+    """
+
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+    except ImportError as exc:
+        raise ImportError(
+            "key pair secrets need the cryptography package") from exc
+
+    if key_type == RSA:
+        private_key = rsa.generate_private_key(public_exponent=65537,
+                                               key_size=key_size)
+    elif key_type == ED25519:
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        raise ValueError(f"unsupported key type {key_type!r}")
+
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_ssh = private_key.public_key().public_bytes(
+        serialization.Encoding.OpenSSH,
+        serialization.PublicFormat.OpenSSH,
+    )
+    return {
+        "KeyType": key_type,
+        "PrivateKey": private_pem.decode("ascii"),
+        "PublicKey": public_ssh.decode("ascii"),
+    }
+
+
+def _key_pool(processes: Optional[int] = None):
+    global _pool, _pool_workers, _pool_unavailable
+
+    if _pool is not None or _pool_unavailable:
+        return _pool
+    with _pool_lock:
+        if _pool is None and not _pool_unavailable:
+            # imported here, like the thread pool in `rotate_many`
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            try:
+                # forking a process that runs the log writer and worker
+                # threads can copy held locks into the child, "spawn" starts
+                # clean interpreters
+                _pool_workers = processes or os.cpu_count() or 1
+                _pool = ProcessPoolExecutor(
+                    max_workers=_pool_workers,
+                    mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError):
+                _pool_unavailable = True
+    return _pool
+
+
+def shutdown_key_pool(wait: bool = True):
+    """
+    stops the key generation processes, the next key starts a new pool.
+    """
+
+    global _pool, _pool_unavailable
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+        _pool_unavailable = False
+    if pool is not None:
+        pool.shutdown(wait=wait)
+
+
+def generate_key_pairs(count: int, key_type: str = ED25519,
+                       key_size: int = RSA_KEY_SIZE,
+                       processes: Optional[int] = None) -> List[dict]:
+    """
+    generates `count` key pairs on the shared process pool, `processes` sizes
+    the pool when this call creates it and defaults to the number of cores.
+    """
+
+    pool = _key_pool(processes)
+    if pool is None:
+        return [generate_key_pair(key_type, key_size) for _ in range(count)]
+    # a few keys per task amortise the pickling round trip for Ed25519 keys,
+    # which take far less time to make than to ship
+    chunksize = max(1, count // (_pool_workers * 4))
+    return list(pool.map(generate_key_pair, [key_type] * count,
+                         [key_size] * count, chunksize=chunksize))
+
+
+def generate_secret_string(secret_type: str = PASSWORD) -> str:
+    """
+    the SecretString of a new version of a `secret_type` secret: a 32
+    character password, or a key pair serialised as JSON. RSA keys come from
+    the process pool, the calling thread blocks on it without holding the
+    GIL.
+    """
+
+    if secret_type == PASSWORD:
+        return generate_password(32)
+    if secret_type not in KEY_TYPES:
+        raise ValueError(f"unsupported secret type {secret_type!r}")
+
+    pool = _key_pool() if secret_type in POOLED_KEY_TYPES else None
+    if pool is None:
+        key_pair = generate_key_pair(secret_type)
+    else:
+        key_pair = pool.submit(generate_key_pair, secret_type).result()
+    return json.dumps(key_pair)
+
+
+def generate_secret_strings(count: int,
+                            secret_type: str = PASSWORD) -> List[str]:
+    """
+    `count` values as `generate_secret_string` makes them, in bulk: the
+    passwords from one entropy read and RSA keys spread over the pool.
+    """
+
+    if secret_type == PASSWORD:
+        return generate_passwords(count, 32)
+    if secret_type not in KEY_TYPES:
+        raise ValueError(f"unsupported secret type {secret_type!r}")
+    if secret_type in POOLED_KEY_TYPES:
+        key_pairs = generate_key_pairs(count, secret_type)
+    else:
+        key_pairs = [generate_key_pair(secret_type) for _ in range(count)]
+    return [json.dumps(key_pair) for key_pair in key_pairs]
@@ -0,0 +1,101 @@
+"""
+Rotation outside Lambda, for batch hosts and CI. `rotate_locally` runs
+createSecret, setSecret, testSecret and finishSecret back to back in this
+process with one client, instead of four Lambda invocations that each may pay
+a cold start, and keeps what createSecret wrote in memory so the later steps
+do not read it back from the service.
+
+    python -m sample.local my/secret [other/secret ...] [--region eu-west-1]
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from .backends import CachingBackend, SecretsBackend, VersionCache
+from .keys import KEY_TYPES, PASSWORD
+from .logs import shared_writer
+from .rotate import (RotationResult, client_backend, get_secrets_client, log,
+                     rotate_secret)
+
+
+def rotate_locally(secret_id: str, token: Optional[str] = None,
+                   backend: SecretsBackend = None,
+                   region_name: Optional[str] = None,
+                   session=None,
+                   secret_type: Optional[str] = None) -> RotationResult:
+    """
+    rotates `secret_id` through all four steps in this process. Without a
+    `backend` the cached client for `region_name` and `session` is used, so
+    rotating several secrets reuses a single client.
+
+    The steps share a private version cache for the duration of the run:
+    the value createSecret stores is what setSecret and testSecret get back
+    without another call, whatever caching `backend` does on its own.
+    """
+
+    if backend is None:
+        backend = client_backend(
+            get_secrets_client(region_name=region_name, session=session))
+    # a handful of entries is enough, a run touches one secret
+    memory = CachingBackend(backend, VersionCache(maxsize=16))
+    try:
+        return rotate_secret(secret_id, backend=memory, token=token,
+                             secret_type=secret_type)
+    finally:
+        log.flush()
+
+
+def main(argv: Optional[List[str]] = None,
+         backend: SecretsBackend = None) -> int:
+    """
+    command line entry point, rotates the given secrets one after the other
+    and prints one JSON line per secret to stdout, the log records go to
+    stderr. Returns 1 if any rotation failed.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python -m sample.local",
+        description="Rotate Secrets Manager secrets in this process.")
+    parser.add_argument("secret_ids", nargs="+", metavar="secret-id")
+    parser.add_argument("--region", help="AWS region of the secrets")
+    parser.add_argument("--profile", help="named AWS profile to use")
+    parser.add_argument("--type", dest="secret_type",
+                        choices=(PASSWORD,) + KEY_TYPES,
+                        help="what to generate, ROTATION_SECRET_TYPE or "
+                             "password by default")
+    args = parser.parse_args(argv)
+
+    session = None
+    if backend is None and args.profile:
+        import boto3
+
+        session = boto3.session.Session(profile_name=args.profile)
+
+    # the results are the output, the JSON log records would be mistaken for
+    # them on the same stream
+    previous_stream, shared_writer.stream = shared_writer.stream, sys.stderr
+    failed = False
+    try:
+        for secret_id in args.secret_ids:
+            result = rotate_locally(secret_id, backend=backend,
+                                    region_name=args.region, session=session,
+                                    secret_type=args.secret_type)
+            failed = failed or not result.ok
+            print(json.dumps({
+                "secret_id": result.secret_id,
+                "version": result.token,
+                "ok": result.ok,
+                "elapsed": round(result.elapsed, 6),
+                "failed_step": result.failed_step,
+                "error": None if result.error is None else repr(result.error),
+            }))
+    finally:
+        log.flush()
+        shared_writer.stream = previous_stream
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
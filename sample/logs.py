@@ -0,0 +1,232 @@
+"""
+Structured JSON logging for the rotation module. Records below the logger
+level cost a single comparison, messages are only %-formatted and serialised
+on a background writer thread, and the writer emits whole batches with one
+write to the stream. Fields that may carry secret material are redacted.
+Loggers from `get_logger` share one writer, calling `flush` on any of them
+before a Lambda invocation returns writes the records of every module, a
+frozen container does not run background threads.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+CRITICAL = 50
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING",
+               ERROR: "ERROR", CRITICAL: "CRITICAL"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+# other names the logging module accepts, LOG_LEVEL is often set for it
+LEVELS.update(WARN=WARNING, FATAL=CRITICAL)
+
+REDACTED = "***"
+# field names, compared case-insensitively, whose values are never written
+REDACTED_FIELDS = frozenset((
+    "password", "secret", "secretstring", "secret_string", "secretbinary",
+    "secret_binary", "value", "new_value",
+))
+
+
+_encode = json.JSONEncoder(default=str).encode
+# formatted timestamp of the current second, strftime is the slowest part of
+# building a record otherwise
+_second_prefix = {}
+
+
+def _format(record, redact):
+    timestamp, level, name, message, args, fields = record
+    if args:
+        message = message % args
+    second = int(timestamp)
+    prefix = _second_prefix.get(second)
+    if prefix is None:
+        _second_prefix.clear()
+        prefix = _second_prefix[second] = time.strftime(
+            "%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+    document = {
+        "timestamp": f"{prefix}.{int(timestamp * 1000) % 1000:03d}Z",
+        "level": LEVEL_NAMES.get(level, str(level)),
+        "logger": name,
+        "message": message,
+    }
+    for key, value in fields.items():
+        document[key] = REDACTED if key.lower() in redact else value
+    return _encode(document)
+
+
+class BufferedWriter:
+    """
+    collects records and writes them from a daemon thread, either every
+    `interval` seconds, once `max_buffer` records are pending, or when
+    `flush` is called. The stream defaults to `sys.stdout`, looked up at
+    write time.
+    """
+
+    def __init__(self, stream=None, interval: float = 1.0,
+                 max_buffer: int = 1000,
+                 redact: frozenset = REDACTED_FIELDS):
+        self.stream = stream
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.redact = redact
+        # deque appends are atomic, so the hot path does not take the
+        # condition lock
+        self._pending = deque()
+        self._in_flight = 0
+        self._written = 0
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, record):
+        self._pending.append(record)
+        # wake the writer once when the buffer fills up, it keeps draining
+        # on its own while records keep coming faster than it writes
+        if self._thread is None or len(self._pending) == self.max_buffer:
+            with self._cond:
+                if self._thread is None:
+                    self._start()
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        blocks until every record submitted so far is written, returns False
+        if `timeout` expired first.
+        """
+
+        with self._cond:
+            target = self._written + self._in_flight + len(self._pending)
+            if self._written >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: self._written >= target, timeout)
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sample-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush, 1.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._flush_requested
+                    or len(self._pending) >= self.max_buffer,
+                    self.interval)
+                batch = []
+                while self._pending:
+                    batch.append(self._pending.popleft())
+                self._in_flight = len(batch)
+                self._flush_requested = False
+
+            if batch:
+                lines = []
+                for record in batch:
+                    try:
+                        lines.append(_format(record, self.redact))
+                    except Exception as exc:
+                        lines.append(json.dumps({
+                            "level": "ERROR", "logger": record[2],
+                            "message": f"unformattable record: {exc!r}"}))
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except Exception as exc:
+                    # the writer must survive, `flush` callers wait on it
+                    sys.stderr.write(f"log writer failed: {exc!r}\n")
+
+            with self._cond:
+                self._written += len(batch)
+                self._in_flight = 0
+                self._cond.notify_all()
+
+
+def _parse_level(level) -> Optional[int]:
+    # a level number, its name or a numeric string, None when it is neither
+    if isinstance(level, int):
+        return level
+    level = level.strip().upper()
+    if level.isdigit():
+        return int(level)
+    return LEVELS.get(level)
+
+
+class StructuredLogger:
+    """
+    JSON logger, `message` may hold %-style placeholders filled from `args`
+    and keyword arguments become top-level JSON fields. `level` is a level
+    number, a numeric string or a level name, WARN and FATAL included. An
+    unknown level falls back to INFO with a warning record rather than
+    failing, it usually comes from the environment.
+    """
+
+    def __init__(self, name: str, level=INFO,
+                 writer: Optional[BufferedWriter] = None):
+        self.name = name
+        self.writer = writer if writer is not None else BufferedWriter()
+        parsed = _parse_level(level)
+        self.level = INFO if parsed is None else parsed
+        if parsed is None:
+            self.warning("unknown log level, using INFO", log_level=level)
+
+    def enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, level: int, message: str, *args, **fields):
+        if level < self.level:
+            return
+        self.writer.submit(
+            (time.time(), level, self.name, message, args, fields))
+
+    def debug(self, message: str, *args, **fields):
+        if DEBUG >= self.level:
+            self.writer.submit(
+                (time.time(), DEBUG, self.name, message, args, fields))
+
+    def info(self, message: str, *args, **fields):
+        if INFO >= self.level:
+            self.writer.submit(
+                (time.time(), INFO, self.name, message, args, fields))
+
+    def warning(self, message: str, *args, **fields):
+        if WARNING >= self.level:
+            self.writer.submit(
+                (time.time(), WARNING, self.name, message, args, fields))
+
+    def error(self, message: str, *args, **fields):
+        if ERROR >= self.level:
+            self.writer.submit(
+                (time.time(), ERROR, self.name, message, args, fields))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.writer.flush(timeout)
+
+
+# the writer behind every `get_logger` logger, one thread and one buffer for
+# the whole process, so a single `flush` covers the records of every module
+# and they come out in the order they were logged
+shared_writer = BufferedWriter()
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """
+    logger whose level comes from the LOG_LEVEL environment variable, INFO by
+    default, writing through `shared_writer`.
+    """
+
+    return StructuredLogger(name, os.environ.get("LOG_LEVEL", "INFO"),
+                            writer=shared_writer)
@@ -0,0 +1,282 @@
+"""
+In-process latency histograms and counters for rotation steps and backend
+calls, exported as CloudWatch Embedded Metric Format (EMF) lines. Everything
+is keyed by a dimension, ("Step", "createSecret") or ("Operation",
+"put_secret_value"), which becomes the EMF dimension as well.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+
+def _bucket(value: int) -> Tuple[int, int]:
+    # keep the top four significant bits, so every bucket is at most 1/8th
+    # of its value wide
+    shift = max(value.bit_length() - 4, 0)
+    return shift, value >> shift
+
+
+def _unit(metric: str) -> str:
+    if metric.startswith("Bytes"):
+        return "Bytes"
+    if metric.endswith("PerSecond"):
+        return "Count/Second"
+    return "Count"
+
+
+class Histogram:
+    """
+    log-linear histogram of durations, recorded in microseconds with a
+    relative error below 12.5%.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        key = _bucket(int(seconds * 1e6))
+        with self._lock:
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """
+        approximate `q` percentile (0-100) in seconds, the midpoint of the
+        bucket it falls in.
+        """
+
+        with self._lock:
+            buckets = sorted(self._buckets.items())
+            count = self.count
+        if not count:
+            return 0.0
+
+        rank = q / 100 * count
+        seen = 0
+        for (shift, mantissa), bucket_count in buckets:
+            seen += bucket_count
+            if seen >= rank:
+                break
+        low = mantissa << shift
+        return (low + ((1 << shift) - 1) / 2) / 1e6
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """
+    registry of histograms, counters and gauges. `observe`, `increment` and
+    `gauge` record whatever they are given, `enabled` is for callers to
+    check before timing anything, so a disabled registry costs them one
+    attribute read.
+    """
+
+    def __init__(self, enabled: bool = False,
+                 namespace: str = "SecretsRotation"):
+        self.enabled = enabled
+        self.namespace = namespace
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: "Counter[Tuple[str, str, str]]" = Counter()
+        self.gauges: Dict[Tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, dimension: str, name: str, seconds: float):
+        key = (dimension, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        histogram.record(seconds)
+
+    def increment(self, dimension: str, name: str, metric: str,
+                  amount: int = 1):
+        with self._lock:
+            self.counters[(dimension, name, metric)] += amount
+
+    def gauge(self, dimension: str, name: str, metric: str, value: float):
+        """
+        sets `metric` to `value`, only the last value before a flush is
+        exported.
+        """
+
+        with self._lock:
+            self.gauges[(dimension, name, metric)] = value
+
+    def snapshot(self) -> dict:
+        """
+        `{dimension: {name: {...summary, counter: value}}}`, durations in
+        seconds.
+        """
+
+        result: Dict[str, Dict[str, dict]] = {}
+        with self._lock:
+            histograms = list(self.histograms.items())
+            counters = list(self.counters.items())
+            counters += list(self.gauges.items())
+        for (dimension, name), histogram in histograms:
+            result.setdefault(dimension, {})[name] = histogram.summary()
+        for (dimension, name, metric), value in counters:
+            result.setdefault(dimension, {}).setdefault(name, {})[metric] = \
+                value
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def emf_lines(self, timestamp: Optional[float] = None) -> List[str]:
+        """
+        one EMF document per dimension value, latency percentiles in
+        milliseconds next to the counters recorded for it.
+        """
+
+        timestamp_ms = int((timestamp or time.time()) * 1000)
+        lines = []
+        for dimension, names in self.snapshot().items():
+            for name, values in names.items():
+                document = {dimension: name}
+                definitions = []
+                if "count" in values:
+                    for metric, key in (("LatencyP50", "p50"),
+                                        ("LatencyP99", "p99"),
+                                        ("LatencyMax", "max")):
+                        document[metric] = round(values[key] * 1000, 3)
+                        definitions.append(
+                            {"Name": metric, "Unit": "Milliseconds"})
+                    document["Count"] = values["count"]
+                    definitions.append({"Name": "Count", "Unit": "Count"})
+                for metric, value in values.items():
+                    if metric[0].isupper():
+                        document[metric] = value
+                        definitions.append(
+                            {"Name": metric,
+                             "Unit": _unit(metric)})
+                document["_aws"] = {
+                    "Timestamp": timestamp_ms,
+                    "CloudWatchMetrics": [{
+                        "Namespace": self.namespace,
+                        "Dimensions": [[dimension]],
+                        "Metrics": definitions,
+                    }],
+                }
+                lines.append(json.dumps(document))
+        return lines
+
+    def flush(self, stream=None):
+        """
+        writes the EMF lines to `stream`, stdout by default, in one write and
+        starts over with empty histograms.
+        """
+
+        lines = self.emf_lines()
+        self.reset()
+        if lines:
+            stream = stream or sys.stdout
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+
+    def instrument_client(self, client):
+        """
+        hooks botocore events of `client` to count bytes sent and received
+        per operation. The hooks check `enabled` on every call, so
+        instrumenting a client is harmless while metrics are off. Retries are
+        not botocore's, `ResilientBackend` counts them.
+        """
+
+        events = client.meta.events
+        events.register("request-created.secrets-manager",
+                        self._on_request_created)
+        events.register("after-call.secrets-manager", self._on_after_call)
+
+    def _on_request_created(self, request=None, operation_name=None,
+                            **kwargs):
+        if not self.enabled or request is None:
+            return
+        from botocore import xform_name
+
+        body = request.body or b""
+        self.increment("Operation", xform_name(operation_name), "BytesSent",
+                       len(body))
+
+    def _on_after_call(self, http_response=None, model=None, **kwargs):
+        if not self.enabled or model is None:
+            return
+        from botocore import xform_name
+
+        if http_response is not None:
+            self.increment("Operation", xform_name(model.name),
+                           "BytesReceived", len(http_response.content or b""))
+
+
+class InstrumentedBackend:
+    """
+    times every call of the wrapped backend into `metrics` under the
+    "Operation" dimension and counts errors by code. Works for both blocking
+    and coroutine backends.
+    """
+
+    def __init__(self, backend, metrics: Metrics):
+        self.backend = backend
+        self.metrics = metrics
+
+    def _call(self, operation, kwargs):
+        start = time.perf_counter()
+        try:
+            result = getattr(self.backend, operation)(**kwargs)
+        except Exception as exc:
+            self._failed(operation, start, exc)
+            raise
+        if hasattr(result, "__await__"):
+            return self._await(operation, start, result)
+        self.metrics.observe("Operation", operation,
+                             time.perf_counter() - start)
+        return result
+
+    async def _await(self, operation, start, awaitable):
+        try:
+            result = await awaitable
+        except Exception as exc:
+            self._failed(operation, start, exc)
+            raise
+        self.metrics.observe("Operation", operation,
+                             time.perf_counter() - start)
+        return result
+
+    def _failed(self, operation, start, exc):
+        self.metrics.observe("Operation", operation,
+                             time.perf_counter() - start)
+        code = getattr(exc, "code", type(exc).__name__)
+        self.metrics.increment("Operation", operation, f"Errors{code}")
+
+    def put_secret_value(self, **kwargs):
+        return self._call("put_secret_value", kwargs)
+
+    def get_secret_value(self, **kwargs):
+        return self._call("get_secret_value", kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        return self._call("list_secret_version_ids", kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        return self._call("update_secret_version_stage", kwargs)
@@ -0,0 +1,220 @@
+"""
+Password generation for the rotation steps. Entropy comes from `os.urandom`
+in bulk and is mapped onto the alphabet with `bytes.translate`, so the whole
+password is produced by a couple of C-level calls instead of one Python-level
+call per character.
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+LOWERCASE = "abcdefghijklmnopqrstuvwxyz"
+UPPERCASE = LOWERCASE.upper()
+DIGITS = "0123456789"
+ALPHANUMERIC = LOWERCASE + UPPERCASE + DIGITS
+# punctuation without quotes, backslash, slash and backtick, which tend to
+# break connection strings and shell scripts
+SYMBOLS = "!#$%&()*+,-.:;<=>?@[]^_{|}~"
+AMBIGUOUS = "0O1Il|"
+
+_translations: Dict[str, Tuple[bytes, bytes, int]] = {}
+
+
+def _translation(alphabet: str) -> Tuple[bytes, bytes, int]:
+    """
+    returns the `bytes.translate` table and delete set mapping random bytes
+    onto `alphabet` without bias, plus the number of accepted byte values.
+    Bytes at or above the largest multiple of the alphabet size are rejected,
+    so every character is reached by the same number of byte values.
+    """
+
+    translation = _translations.get(alphabet)
+    if translation is not None:
+        return translation
+
+    size = len(alphabet)
+    if not 0 < size <= 256 or len(set(alphabet)) != size:
+        raise ValueError("alphabet needs 1 to 256 distinct characters")
+    try:
+        codes = alphabet.encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("alphabet must be ASCII") from None
+
+    accepted = 256 - 256 % size
+    table = bytes(codes[b % size] if b < accepted else 0 for b in range(256))
+    delete = bytes(range(accepted, 256))
+    translation = _translations[alphabet] = (table, delete, accepted)
+    return translation
+
+
+def _random_ascii(length: int, alphabet: str) -> bytes:
+    if length < 0:
+        raise ValueError("length must not be negative")
+
+    table, delete, accepted = _translation(alphabet)
+    out = b""
+    while len(out) < length:
+        missing = length - len(out)
+        # over-read slightly so a single call almost always has enough bytes
+        # left after rejection
+        out += os.urandom(missing * 256 // accepted + 16).translate(
+            table, delete)
+    return out[:length]
+
+
+def random_string(length: int, alphabet: str = ALPHANUMERIC) -> str:
+    """
+    returns `length` characters drawn uniformly from `alphabet` using the
+    operating system CSPRNG.
+    """
+
+    return _random_ascii(length, alphabet).decode("ascii")
+
+
+def _shuffle(items: list, count: Optional[int] = None) -> list:
+    """
+    unbiased in-place Fisher-Yates shuffle, indices come from one bulk
+    `os.urandom` read and are rejection sampled per position. With `count`
+    only the first `count` positions are settled, which is enough to draw a
+    uniform sample without replacement from `items[:count]`.
+    """
+
+    n = len(items)
+    count = n - 1 if count is None else min(count, n - 1)
+    entropy = os.urandom(4 * count + 64)
+    offset = 0
+    for i in range(count):
+        bound = n - i
+        limit = (1 << 32) - (1 << 32) % bound
+        while True:
+            if offset + 4 > len(entropy):
+                entropy, offset = os.urandom(4 * (count - i) + 64), 0
+            value = int.from_bytes(entropy[offset:offset + 4], "little")
+            offset += 4
+            if value < limit:
+                break
+        j = i + value % bound
+        items[i], items[j] = items[j], items[i]
+    return items
+
+
+class PasswordPolicy:
+    """
+    composition rules for generated passwords. A policy builds a compliant
+    password directly: the required characters of each class are drawn
+    first, the rest is filled from the whole alphabet and the result is
+    shuffled, so there is no generate-and-check loop however strict the
+    rules are. `symbols` is the symbol class, empty to use no symbols at all,
+    `exclude` removes characters from every class (see `AMBIGUOUS`) and
+    `no_repeats` forbids using any character twice.
+    """
+
+    def __init__(self, min_lowercase: int = 0, min_uppercase: int = 0,
+                 min_digits: int = 0, min_symbols: int = 0,
+                 symbols: str = "", exclude: str = "",
+                 no_repeats: bool = False):
+        classes = [
+            (LOWERCASE, min_lowercase),
+            (UPPERCASE, min_uppercase),
+            (DIGITS, min_digits),
+            (symbols, min_symbols),
+        ]
+        self.classes = []
+        for chars, minimum in classes:
+            chars = "".join(c for c in dict.fromkeys(chars) if c not in exclude)
+            if minimum < 0:
+                raise ValueError("class minimums must not be negative")
+            if minimum > 0 and not chars:
+                raise ValueError("a required character class is empty")
+            if no_repeats and minimum > len(chars):
+                raise ValueError(
+                    f"cannot draw {minimum} distinct characters from "
+                    f"{chars!r}")
+            if chars:
+                self.classes.append((chars, minimum))
+
+        self.alphabet = "".join(chars for chars, _ in self.classes)
+        if not self.alphabet:
+            raise ValueError("policy leaves no characters to draw from")
+        # validates the alphabet once instead of on every password
+        _translation(self.alphabet)
+
+        self.required = sum(minimum for _, minimum in self.classes)
+        self.no_repeats = no_repeats
+
+    def generate(self, length: int) -> str:
+        """
+        returns a password of `length` characters satisfying the policy.
+        """
+
+        if length < self.required:
+            raise ValueError(
+                f"length {length} is shorter than the {self.required} "
+                "required characters")
+        if self.no_repeats and length > len(self.alphabet):
+            raise ValueError(
+                f"cannot build {length} distinct characters from an "
+                f"alphabet of {len(self.alphabet)}")
+
+        if self.no_repeats:
+            chars = []
+            for class_chars, minimum in self.classes:
+                chars += _shuffle(list(class_chars), minimum)[:minimum]
+            # fill from what the required draws left over
+            taken = set(chars)
+            left = [c for c in self.alphabet if c not in taken]
+            missing = length - len(chars)
+            chars += _shuffle(left, missing)[:missing]
+        else:
+            chars = []
+            for class_chars, minimum in self.classes:
+                if minimum:
+                    chars += random_string(minimum, class_chars)
+            chars += random_string(length - len(chars), self.alphabet)
+
+        return "".join(_shuffle(chars))
+
+
+def generate_password(length: int,
+                      policy: Optional[PasswordPolicy] = None) -> str:
+    """
+    generates a new random password, alphanumeric unless a `policy` says
+    otherwise
+    """
+
+    if policy is not None:
+        return policy.generate(length)
+    return random_string(length, ALPHANUMERIC)
+
+
+def _split(block: str, count: int, length: int) -> List[str]:
+    if length == 0:
+        return [""] * count
+    return [block[i:i + length] for i in range(0, count * length, length)]
+
+
+def _iter_passwords(count, length, alphabet, chunk_size):
+    while count > 0:
+        batch = min(count, chunk_size)
+        yield from _split(random_string(batch * length, alphabet), batch,
+                          length)
+        count -= batch
+
+
+def generate_passwords(count: int, length: int,
+                       alphabet: str = ALPHANUMERIC, lazy: bool = False,
+                       chunk_size: int = 4096
+                       ) -> Union[List[str], Iterator[str]]:
+    """
+    generates `count` passwords of `length` characters from a single entropy
+    read, then slices it. With `lazy` a generator is returned instead, reading
+    entropy for `chunk_size` passwords at a time to bound memory.
+    """
+
+    if count < 0:
+        raise ValueError("count must not be negative")
+    if lazy:
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        return _iter_passwords(count, length, alphabet, chunk_size)
+    return _split(random_string(count * length, alphabet), count, length)
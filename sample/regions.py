@@ -0,0 +1,247 @@
+"""
+Region-scoped rotation work for secrets replicated to several regions.
+Secrets Manager copies every version of the primary secret to its replica
+regions, but each region can have its own copy of the target service. A
+`RegionFanOut` runs the per-region part of setSecret and testSecret in all
+regions at once, so a rotation takes as long as its slowest region rather
+than the sum of them:
+
+- setSecret applies the new value to the target service of every region
+- testSecret checks that the pending version reached every replica, then
+  tests the new value against that region's target service
+
+Install one with `rotate.regions = RegionFanOut([...])`.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+from .backends import AWSCURRENT, AWSPENDING, SecretsBackend
+from .logs import get_logger
+
+log = get_logger(__name__)
+
+
+class RegionResult(NamedTuple):
+    """
+    outcome of one region's share of a step, `error` is None when it
+    succeeded. `elapsed` is the time the work ran, `queued` the time it
+    waited for a thread before that.
+    """
+
+    region: str
+    elapsed: float
+    error: Optional[BaseException] = None
+    queued: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class RegionError(RuntimeError):
+    """
+    the region-scoped work of a step failed in `failed`, the regions mapped
+    to their errors.
+    """
+
+    def __init__(self, step: str, failed: Dict[str, BaseException]):
+        regions = ", ".join(
+            f"{region}: {error!r}" for region, error in sorted(failed.items()))
+        super().__init__(f"{step} failed in {len(failed)} region(s): "
+                         f"{regions}")
+        self.failed = failed
+
+
+def _region_backend(region: str) -> SecretsBackend:
+    # imported here, sample.rotate is the module that installs fan-outs
+    from .rotate import client_backend, get_secrets_client
+
+    # without the version cache, it would answer the replica check with the
+    # version the primary region wrote
+    return client_backend(get_secrets_client(region_name=region),
+                          cached=False)
+
+
+class RegionFanOut:
+    """
+    runs region-scoped work concurrently in `regions`, each with its own
+    backend and, optionally, its own target service connector. `backends`
+    maps a region to its backend, either a dict or a callable, and defaults
+    to the cached client of that region, without the version cache so every
+    replica check asks the region. Regions missing from `connectors`
+    only get the replica check.
+
+    The work runs on a pool of the fan-out's own, `max_workers` threads,
+    enough by default for every region of as many rotations as
+    `rotate_many` runs at once. A region still running `timeout` seconds
+    after it started counts as failed, as does one still waiting for a
+    thread after `queue_timeout` seconds, `timeout` by default, so time
+    spent queued behind other rotations does not eat into the timeout.
+
+    Every call records each region's time in `timings` and the time it was
+    queued in `queued`, and both in `metrics` under the "Region" and
+    "RegionQueue" dimensions when given and enabled.
+    """
+
+    def __init__(self, regions: List[str],
+                 backends: Union[Dict[str, SecretsBackend],
+                                 Callable[[str], SecretsBackend]] = None,
+                 connectors: Optional[Dict[str, object]] = None,
+                 timeout: float = 30.0, metrics=None,
+                 max_workers: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        if not regions:
+            raise ValueError("need at least one region")
+        self.regions = list(regions)
+        if backends is None:
+            backends = _region_backend
+        self._backend_for = (backends.__getitem__
+                             if isinstance(backends, dict) else backends)
+        self._backends: Dict[str, SecretsBackend] = {}
+        self.connectors = dict(connectors or {})
+        self.timeout = timeout
+        self.queue_timeout = timeout if queue_timeout is None \
+            else queue_timeout
+        self.metrics = metrics
+        # rotate_many runs 16 rotations at once by default
+        self.max_workers = max_workers or 16 * len(self.regions)
+        self.timings: Dict[str, float] = {}
+        self.queued: Dict[str, float] = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def backend(self, region: str) -> SecretsBackend:
+        backend = self._backends.get(region)
+        if backend is None:
+            backend = self._backends[region] = self._backend_for(region)
+        return backend
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # imported here, like the thread pool in `rotate_many`
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="sample-region")
+        return self._executor
+
+    def close(self):
+        """
+        shuts the pool down without waiting for region work still running.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _run(self, step: str, work: Callable[[str], None]
+             ) -> Dict[str, RegionResult]:
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        # when each region's work started running, it has not used any of
+        # its timeout while queued behind other rotations
+        started: Dict[str, float] = {}
+
+        def timed(region):
+            start = started[region] = time.monotonic()
+            try:
+                work(region)
+            except Exception as exc:
+                return RegionResult(region, time.monotonic() - start, exc,
+                                    start - submitted)
+            return RegionResult(region, time.monotonic() - start,
+                                queued=start - submitted)
+
+        submitted = time.monotonic()
+        pending = {self._pool().submit(timed, region): region
+                   for region in self.regions}
+        results = {}
+        while pending:
+            # sleep until the earliest deadline, a queued region's being the
+            # end of its queue allowance
+            now = time.monotonic()
+            deadlines = [started[region] + self.timeout if region in started
+                         else submitted + self.queue_timeout
+                         for region in pending.values()]
+            done, _ = wait(pending, timeout=max(min(deadlines) - now, 0.0),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                result = future.result()
+                results[result.region] = result
+
+            now = time.monotonic()
+            for future, region in list(pending.items()):
+                if region in started:
+                    if now - started[region] < self.timeout:
+                        continue
+                    error = TimeoutError(f"no answer within {self.timeout}s")
+                    results[region] = RegionResult(
+                        region, now - started[region], error,
+                        started[region] - submitted)
+                else:
+                    if now - submitted < self.queue_timeout:
+                        continue
+                    error = TimeoutError(
+                        f"not started within {self.queue_timeout}s")
+                    results[region] = RegionResult(region, 0.0, error,
+                                                   now - submitted)
+                # not cancelled, a late answer is ignored
+                del pending[future]
+
+        for region, result in results.items():
+            self.timings[region] = result.elapsed
+            self.queued[region] = result.queued
+            if self.metrics is not None and self.metrics.enabled:
+                self.metrics.observe("Region", region, result.elapsed)
+                self.metrics.observe("RegionQueue", region, result.queued)
+        log.info("region fan-out finished", step=step,
+                 elapsed_ms={region: round(result.elapsed * 1000, 1)
+                             for region, result in sorted(results.items())},
+                 queued_ms={region: round(result.queued * 1000, 1)
+                            for region, result in sorted(results.items())})
+        failed = {region: result.error for region, result in results.items()
+                  if not result.ok}
+        if failed:
+            raise RegionError(step, failed)
+        return results
+
+    def set_password(self, *, SecretId: str,
+                     Password: str) -> Dict[str, RegionResult]:
+        """
+        applies the new value to each region's target service.
+        """
+
+        def work(region):
+            connector = self.connectors.get(region)
+            if connector is not None:
+                connector.set_password(SecretId=SecretId, Password=Password)
+
+        return self._run("setSecret", work)
+
+    def test_password(self, *, SecretId: str, VersionId: str,
+                      Password: str) -> Dict[str, RegionResult]:
+        """
+        checks the version replicated to each region and still carries
+        AWSPENDING, or AWSCURRENT on a replay, then tests it against the
+        region's target service.
+        """
+
+        def work(region):
+            version = self.backend(region).get_secret_value(
+                SecretId=SecretId, VersionId=VersionId)
+            stages = version["VersionStages"]
+            if AWSPENDING not in stages and AWSCURRENT not in stages:
+                raise RuntimeError(f"version has stages {stages} in {region}")
+            connector = self.connectors.get(region)
+            if connector is not None and not connector.test_password(
+                    SecretId=SecretId, Password=Password):
+                raise RuntimeError("the new password was rejected")
+
+        return self._run("testSecret", work)
@@ -0,0 +1,129 @@
+"""
+Pre-generated secret values. A reservoir keeps a bounded stock of fresh
+passwords or key pairs of one type, topped up in batches by a background
+thread, so createSecret takes a value in O(1) instead of generating it while
+the rotation waits.
+
+Each value is handed out once and the reservoir's copy is overwritten with
+zeros as it leaves. The string given to the caller is an immutable Python
+object and cannot be wiped, it lives until it is garbage collected like any
+value generated on demand.
+"""
+
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+from .keys import PASSWORD, generate_secret_strings
+from .logs import get_logger
+
+log = get_logger(__name__)
+
+
+def _wipe(buffer: bytearray):
+    buffer[:] = bytes(len(buffer))
+
+
+class SecretReservoir:
+    """
+    up to `size` values of `secret_type`, refilled `batch` at a time once
+    the stock falls to `low_water`. `take` never waits for the filler: an
+    empty reservoir generates the value on the spot and counts a miss.
+    """
+
+    def __init__(self, secret_type: str = PASSWORD, size: int = 64,
+                 low_water: Optional[int] = None, batch: int = 16,
+                 generate: Callable[[int, str], List[str]] =
+                 generate_secret_strings):
+        if size < 1 or batch < 1:
+            raise ValueError("size and batch must be positive")
+        self.secret_type = secret_type
+        self.size = size
+        self.low_water = size // 2 if low_water is None else low_water
+        self.batch = batch
+        self.generate = generate
+        self.hits = 0
+        self.misses = 0
+        # deque appends and pops are atomic, `take` does not lock
+        self._values = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._fill, name=f"sample-reservoir-{secret_type}",
+            daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._values)
+
+    def take(self) -> str:
+        """
+        removes one value from the reservoir and returns it.
+        """
+
+        try:
+            buffer = self._values.popleft()
+        except IndexError:
+            self.misses += 1
+            self._wake()
+            return self.generate(1, self.secret_type)[0]
+
+        self.hits += 1
+        # wake the filler once on the way down, it tops up to `size`
+        if len(self._values) == self.low_water:
+            self._wake()
+        try:
+            return buffer.decode("utf-8")
+        finally:
+            _wipe(buffer)
+
+    def wait_full(self, timeout: Optional[float] = None) -> bool:
+        """
+        blocks until the reservoir is full, returns False if `timeout`
+        expired first.
+        """
+
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: len(self._values) >= self.size or self._closed,
+                timeout)
+
+    def close(self):
+        """
+        stops the filler and wipes every value not handed out.
+        """
+
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        while self._values:
+            _wipe(self._values.popleft())
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed
+                    or len(self._values) <= self.low_water)
+                if self._closed:
+                    return
+
+            while len(self._values) < self.size and not self._closed:
+                missing = min(self.batch, self.size - len(self._values))
+                try:
+                    values = self.generate(missing, self.secret_type)
+                except Exception as exc:
+                    log.error("reservoir refill failed",
+                              secret_type=self.secret_type, error=repr(exc))
+                    with self._cond:
+                        self._cond.wait(1.0)
+                    continue
+                for value in values:
+                    self._values.append(bytearray(value.encode("utf-8")))
+                with self._cond:
+                    self._cond.notify_all()
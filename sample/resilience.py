@@ -0,0 +1,440 @@
+"""
+Retries for Secrets Manager calls that back off under throttling instead of
+hammering the API: decorrelated-jitter delays, a retry budget capping retries
+to a fraction of the traffic, and a circuit breaker that stops calling an
+endpoint that keeps failing. A client-side rate limiter keeps each API under
+its request quota so throttling is the exception rather than the feedback
+loop. Breakers, budgets and limiters are shared per endpoint, so every worker
+of a bulk run sees the same state.
+
+botocore retries on its own as well, `get_secrets_client` builds clients
+with `Config(retries={"total_max_attempts": 1})` to leave retrying to this
+layer. Clients built elsewhere need the same setting.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Optional, Tuple, Union
+
+from .backends import SecretsBackend, SecretsBackendError
+
+# error codes worth retrying: throttling and transient server side failures
+RETRYABLE_CODES = frozenset((
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "InternalServiceError",
+    "InternalFailure",
+    "ServiceUnavailable",
+))
+# the subset that means "slow down" rather than "something broke"
+THROTTLING_CODES = frozenset((
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+))
+# default Secrets Manager request quotas per account and region, in requests
+# per second, as documented at the time of writing. A tuple of operations
+# shares one quota: PutSecretValue, UpdateSecretVersionStage and the other
+# write APIs count against a combined one. Raised quotas should be passed to
+# `RateLimiter` explicitly.
+DEFAULT_QUOTAS = {
+    "get_secret_value": 10000.0,
+    "list_secret_version_ids": 50.0,
+    ("put_secret_value", "update_secret_version_stage"): 50.0,
+}
+
+
+def is_retryable(exc: BaseException,
+                 codes: FrozenSet[str] = RETRYABLE_CODES) -> bool:
+    if isinstance(exc, SecretsBackendError):
+        return exc.code in codes
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class RetryPolicy:
+    """
+    up to `max_attempts` calls in total, spaced by decorrelated jitter: each
+    delay is drawn uniformly between `base_delay` and three times the
+    previous one, capped at `max_delay`.
+    """
+
+    def __init__(self, max_attempts: int = 10, base_delay: float = 0.05,
+                 max_delay: float = 5.0,
+                 retryable: FrozenSet[str] = RETRYABLE_CODES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable
+
+    def next_delay(self, previous: float) -> float:
+        # imported here, only the retry path needs it
+        import random
+
+        upper = max(self.base_delay, previous * 3)
+        return min(self.max_delay, random.uniform(self.base_delay, upper))
+
+
+class RetryBudget:
+    """
+    token bucket limiting retries to `ratio` of the calls made, plus a floor
+    of `min_per_second` so a quiet endpoint can still retry. Without a
+    budget, every worker retrying at once multiplies the load exactly when
+    the service is asking for less.
+    """
+
+    def __init__(self, ratio: float = 0.5, min_per_second: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.clock = clock
+        self.max_balance = max(min_per_second * 10, 1.0)
+        self._balance = self.max_balance
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, deposit):
+        now = self.clock()
+        self._balance = min(
+            self.max_balance,
+            self._balance + deposit
+            + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_call(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill(0.0)
+            if self._balance < 1.0:
+                return False
+            self._balance -= 1.0
+            return True
+
+
+class CircuitBreaker:
+    """
+    opens after `failure_threshold` consecutive failures and rejects calls
+    for `recovery_time` seconds, then lets a single probe through
+    (half-open): its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 20,
+                 recovery_time: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self._opened_at < self.recovery_time:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN \
+                    or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+
+_guards: Dict[str, Tuple[CircuitBreaker, RetryBudget]] = {}
+_guards_lock = threading.Lock()
+
+
+def endpoint_guards(endpoint: str) -> Tuple[CircuitBreaker, RetryBudget]:
+    """
+    the circuit breaker and retry budget shared by every caller of
+    `endpoint`.
+    """
+
+    guards = _guards.get(endpoint)
+    if guards is None:
+        with _guards_lock:
+            guards = _guards.setdefault(
+                endpoint, (CircuitBreaker(), RetryBudget()))
+    return guards
+
+
+def reset_endpoint_guards():
+    """
+    forgets every endpoint's breaker, budget and rate limiter.
+    """
+
+    with _guards_lock:
+        _guards.clear()
+        _limiters.clear()
+
+
+class ResilientBackend:
+    """
+    retries the wrapped backend's calls according to `policy`, within the
+    endpoint's retry budget and circuit breaker. When the circuit is open
+    calls fail fast with a `CircuitOpen` error. Blocking backends sleep with
+    `sleep`, coroutine backends with `asyncio.sleep`. `metrics`, when given
+    and enabled, counts retries, rejections and exhausted budgets.
+    """
+
+    def __init__(self, backend: SecretsBackend, endpoint: str = "default",
+                 policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 budget: Optional[RetryBudget] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 metrics=None):
+        shared_breaker, shared_budget = endpoint_guards(endpoint)
+        self.backend = backend
+        self.endpoint = endpoint
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or shared_breaker
+        self.budget = budget or shared_budget
+        self.sleep = sleep
+        self.metrics = metrics
+
+    def _count(self, operation, metric):
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.increment("Operation", operation, metric)
+
+    def _admit(self, operation):
+        if not self.breaker.allow():
+            self._count(operation, "CircuitOpen")
+            raise SecretsBackendError(
+                "CircuitOpen", f"circuit for {self.endpoint} is open")
+        self.budget.record_call()
+
+    def _settle(self, operation, exc, attempt, delay):
+        """
+        records the outcome of an attempt and returns the delay before the
+        next one, or None when `exc` should be raised.
+        """
+
+        if exc is None:
+            self.breaker.record_success()
+            return None
+        if not is_retryable(exc, self.policy.retryable):
+            # the endpoint answered, it is healthy even if the call failed
+            self.breaker.record_success()
+            return None
+
+        if isinstance(exc, SecretsBackendError) \
+                and exc.code in THROTTLING_CODES:
+            # throttling says the endpoint is up but busy, backing off is
+            # the answer, not cutting it off
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if attempt >= self.policy.max_attempts:
+            return None
+        if not self.budget.try_spend():
+            self._count(operation, "RetryBudgetExhausted")
+            return None
+        self._count(operation, "Retries")
+        return self.policy.next_delay(delay)
+
+    def _call(self, operation, kwargs):
+        method = getattr(self.backend, operation)
+        delay = 0.0
+        attempt = 1
+        while True:
+            self._admit(operation)
+            try:
+                result = method(**kwargs)
+            except Exception as exc:
+                delay = self._settle(operation, exc, attempt, delay)
+                if delay is None:
+                    raise
+            else:
+                if hasattr(result, "__await__"):
+                    return self._call_async(operation, kwargs, result)
+                self._settle(operation, None, attempt, delay)
+                return result
+            self.sleep(delay)
+            attempt += 1
+
+    async def _call_async(self, operation, kwargs, first):
+        import asyncio
+
+        method = getattr(self.backend, operation)
+        pending = first
+        delay = 0.0
+        attempt = 1
+        while True:
+            try:
+                result = await pending
+            except Exception as exc:
+                delay = self._settle(operation, exc, attempt, delay)
+                if delay is None:
+                    raise
+            else:
+                self._settle(operation, None, attempt, delay)
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+            self._admit(operation)
+            pending = method(**kwargs)
+
+    def put_secret_value(self, **kwargs):
+        return self._call("put_secret_value", kwargs)
+
+    def get_secret_value(self, **kwargs):
+        return self._call("get_secret_value", kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        return self._call("list_secret_version_ids", kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        return self._call("update_secret_version_stage", kwargs)
+
+
+class TokenBucket:
+    """
+    thread-safe token bucket refilled at `rate` tokens per second up to
+    `burst`. `reserve` always takes a token, going into debt if needed, and
+    returns how long the caller must wait before using it, so concurrent
+    callers are spaced out in arrival order at exactly `rate`.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else 1.0 + rate / 10
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    one token bucket per quota, `quotas` maps an operation name, or a tuple
+    of operations drawing on one shared quota, to requests per second.
+    Operations without a quota are not limited.
+    """
+
+    def __init__(self,
+                 quotas: Optional[Dict[Union[str, Tuple[str, ...]],
+                                       float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        quotas = DEFAULT_QUOTAS if quotas is None else quotas
+        self.buckets: Dict[str, TokenBucket] = {}
+        for operations, rate in quotas.items():
+            bucket = TokenBucket(rate, clock=clock)
+            if isinstance(operations, str):
+                operations = (operations,)
+            for operation in operations:
+                self.buckets[operation] = bucket
+
+    def reserve(self, operation: str) -> float:
+        bucket = self.buckets.get(operation)
+        return bucket.reserve() if bucket is not None else 0.0
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def endpoint_rate_limiter(endpoint: str) -> RateLimiter:
+    """
+    the rate limiter, with `DEFAULT_QUOTAS`, shared by every caller of
+    `endpoint`.
+    """
+
+    limiter = _limiters.get(endpoint)
+    if limiter is None:
+        with _guards_lock:
+            limiter = _limiters.setdefault(endpoint, RateLimiter())
+    return limiter
+
+
+class RateLimitedBackend:
+    """
+    takes a token from `limiter` before each call of the wrapped blocking
+    backend and sleeps for its turn. Coroutine backends need
+    `AsyncRateLimitedBackend`, which waits without blocking the event loop.
+    """
+
+    def __init__(self, backend: SecretsBackend,
+                 limiter: Optional[RateLimiter] = None,
+                 endpoint: str = "default",
+                 sleep: Callable[[float], None] = time.sleep):
+        self.backend = backend
+        self.limiter = limiter or endpoint_rate_limiter(endpoint)
+        self.sleep = sleep
+
+    def _call(self, operation, kwargs):
+        delay = self.limiter.reserve(operation)
+        if delay > 0:
+            self.sleep(delay)
+        return getattr(self.backend, operation)(**kwargs)
+
+    def put_secret_value(self, **kwargs):
+        return self._call("put_secret_value", kwargs)
+
+    def get_secret_value(self, **kwargs):
+        return self._call("get_secret_value", kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        return self._call("list_secret_version_ids", kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        return self._call("update_secret_version_stage", kwargs)
+
+
+class AsyncRateLimitedBackend(RateLimitedBackend):
+    """
+    `RateLimitedBackend` for coroutine backends, every method is a coroutine
+    that waits for its token with `asyncio.sleep`, so the same limiter paces
+    threads and tasks alike. The asyncio drivers' default stack,
+    `rotate.async_client_backend`, waits with it.
+    """
+
+    async def _call(self, operation, kwargs):
+        import asyncio
+
+        delay = self.limiter.reserve(operation)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        result = getattr(self.backend, operation)(**kwargs)
+        if hasattr(result, "__await__"):
+            result = await result
+        return result
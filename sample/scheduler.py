@@ -0,0 +1,249 @@
+"""
+Just-in-time rotation of a secret inventory. Every secret has a rotation
+interval, the scheduler keeps a heap of secrets keyed by the time their next
+rotation is due and hands due secrets to a worker pool running the four
+rotation steps. Adding, rescheduling and popping a secret are O(log n).
+
+To avoid a burst when many secrets share an interval and were created
+together, each secret is rotated up to `window` seconds (at most half its
+interval) early by an offset derived from its ID, which spreads such a cohort
+evenly across the window. Secrets never rotated before are due that offset
+after being added, so onboarding a whole inventory is spread out too. The
+offset is applied once: every later rotation is due a whole number of
+intervals after the first, so the cohort stays spread out and each secret is
+rotated every `interval`, however long its rotations or retries took.
+"""
+
+import heapq
+import math
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .backends import SecretsBackend
+from .logs import get_logger
+from .rotate import RotationResult, rotate_secret
+
+log = get_logger(__name__)
+
+
+class RotationScheduler:
+    """
+    heap of secrets by next-due time. `add` registers a secret to be rotated
+    every `interval` seconds, `run_pending` dispatches the secrets due now
+    and `run` keeps doing so until `stop` is called. A rotation that fails
+    is retried after `retry_delay` seconds, or its interval if shorter.
+    `results` holds the last `keep_results` outcomes, `rotations` and
+    `failures` count all of them.
+
+    Removed or rescheduled secrets leave their old heap entry behind, it is
+    skipped when popped, so no operation has to search the heap.
+    """
+
+    def __init__(self, backend: SecretsBackend = None, max_workers: int = 16,
+                 window: float = 3600.0, retry_delay: float = 300.0,
+                 clock: Callable[[], float] = time.time,
+                 rotate: Callable[..., RotationResult] = rotate_secret,
+                 keep_results: int = 1000):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.window = window
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.rotate = rotate
+        # bounded, `run` may go on for months over a large inventory
+        self.results: Deque[RotationResult] = deque(maxlen=keep_results)
+        self.rotations = 0
+        self.failures = 0
+        # heap of [due, secret_id, interval, slot], an entry is stale once
+        # its secret maps to another entry in `_entries`. `slot` is the due
+        # time of the rotation, which a failed attempt's retries keep, so the
+        # next one is due `interval` after it.
+        self._heap: list = []
+        self._entries: Dict[str, list] = {}
+        self._running: Dict[str, Tuple[float, float]] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._executor = None
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries) + len(self._running)
+
+    def _offset(self, secret_id: str, interval: float) -> float:
+        # stable across processes, unlike hash(). Capped at half the interval
+        # so a secret is never rotated again right after its rotation.
+        spread = min(self.window, interval / 2)
+        return zlib.crc32(secret_id.encode()) / 2 ** 32 * spread
+
+    def _push(self, secret_id: str, due: float, interval: float,
+              slot: Optional[float] = None):
+        # under self._cond
+        entry = [due, secret_id, interval, due if slot is None else slot]
+        self._entries[secret_id] = entry
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._cond.notify_all()
+
+    def add(self, secret_id: str, interval: float,
+            last_rotated: Optional[float] = None):
+        """
+        schedules `secret_id` for rotation every `interval` seconds. A secret
+        never rotated, `last_rotated` None, is due within the window from
+        now, at its offset, so onboarding an inventory is spread out like a
+        cohort. Adding a secret again replaces its interval and due time.
+        """
+
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if last_rotated is None:
+            due = self.clock() + self._offset(secret_id, interval)
+        else:
+            due = last_rotated + interval - self._offset(secret_id, interval)
+        with self._cond:
+            if secret_id in self._running:
+                # picked up with the new interval once the rotation finishes
+                _, slot = self._running[secret_id]
+                self._running[secret_id] = (interval, slot)
+                return
+            self._push(secret_id, due, interval)
+
+    def remove(self, secret_id: str):
+        with self._cond:
+            self._entries.pop(secret_id, None)
+            self._running.pop(secret_id, None)
+
+    def next_due(self) -> Optional[float]:
+        """
+        time the earliest scheduled rotation is due, None when there is none.
+        """
+
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._entries.get(heap[0][1]) is not heap[0]:
+            heapq.heappop(heap)
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        removes and returns the secrets due at `now`, they count as running
+        until `complete` is called for them.
+        """
+
+        now = self.clock() if now is None else now
+        due = []
+        with self._cond:
+            self._drop_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, secret_id, interval, slot = heapq.heappop(self._heap)
+                del self._entries[secret_id]
+                self._running[secret_id] = (interval, slot)
+                due.append(secret_id)
+                self._drop_stale()
+        return due
+
+    def complete(self, result: RotationResult):
+        """
+        reschedules a secret after its rotation finished, a full interval
+        after the time it was due when it succeeded and after `retry_delay`
+        when it failed. A secret that fell behind, its next due time less
+        than half an interval away, skips to the following one rather than
+        being rotated again right away.
+        """
+
+        now = self.clock()
+        with self._cond:
+            self.results.append(result)
+            self.rotations += 1
+            if not result.ok:
+                self.failures += 1
+            running = self._running.pop(result.secret_id, None)
+            if running is None:
+                # removed while rotating
+                return
+            interval, slot = running
+            if result.ok:
+                due = slot + interval
+                behind = now + interval / 2 - due
+                if behind > 0:
+                    due += math.ceil(behind / interval) * interval
+                self._push(result.secret_id, due, interval)
+            else:
+                self._push(result.secret_id,
+                           now + min(self.retry_delay, interval), interval,
+                           slot)
+
+        if not result.ok:
+            log.warning("rotation failed, retrying later",
+                        secret_id=result.secret_id, step=result.failed_step,
+                        error=repr(result.error))
+
+    def _rotate(self, secret_id: str):
+        try:
+            result = self.rotate(secret_id, backend=self.backend)
+        except Exception as exc:
+            result = RotationResult(secret_id, "", 0.0, None, exc)
+        self.complete(result)
+
+    def run_pending(self) -> int:
+        """
+        dispatches every due secret to the worker pool and returns how many
+        were dispatched, without waiting for the rotations.
+        """
+
+        if self._executor is None:
+            # imported here like in rotate_many, for the cold start
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="sample-rotation")
+        # submitting under the lock keeps `stop` from shutting the pool down
+        # in between
+        with self._cond:
+            if self._stopped:
+                return 0
+            due = self.pop_due()
+            for secret_id in due:
+                self._executor.submit(self._rotate, secret_id)
+        return len(due)
+
+    def run(self, poll_interval: float = 60.0):
+        """
+        dispatches rotations as they fall due until `stop` is called. The
+        loop sleeps until the next due time, at most `poll_interval` seconds,
+        and wakes up early when an earlier secret is added. `clock` must be
+        wall clock time for this.
+        """
+
+        while True:
+            self.run_pending()
+            with self._cond:
+                if self._stopped:
+                    break
+                self._drop_stale()
+                timeout = poll_interval
+                if self._heap:
+                    timeout = min(timeout,
+                                  max(self._heap[0][0] - self.clock(), 0))
+                self._cond.wait(timeout)
+                if self._stopped:
+                    break
+
+    def stop(self, wait: bool = True):
+        """
+        ends `run` and shuts the worker pool down, waiting for rotations in
+        progress when `wait` is set.
+        """
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        log.flush()
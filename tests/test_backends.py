@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import unittest
+
+from sample.backends import (AWSCURRENT, AWSPENDING, AWSPREVIOUS,
+                             CachingBackend, InMemoryBackend,
+                             SecretsBackendError, ThreadedAsyncBackend,
+                             VersionCache)
+
+
+class InMemoryBackendTestSuite(unittest.TestCase):
+    """In-memory Secrets Manager stand-in."""
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.create_secret(Name="db", SecretString="old",
+                                   ClientRequestToken="v1")
+
+    def stages(self, version_id):
+        return self.backend.get_secret_value(
+            SecretId="db", VersionId=version_id)["VersionStages"]
+
+    def test_pending_version_does_not_replace_current(self):
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="v2", SecretString="new",
+            VersionStages=[AWSPENDING])
+        current = self.backend.get_secret_value(SecretId="db")
+        self.assertEqual(current["SecretString"], "old")
+        self.assertEqual(self.stages("v2"), [AWSPENDING])
+
+    def test_put_is_idempotent_per_token(self):
+        for _ in range(2):
+            self.backend.put_secret_value(
+                SecretId="db", ClientRequestToken="v2", SecretString="new",
+                VersionStages=[AWSPENDING])
+        with self.assertRaises(SecretsBackendError) as ctx:
+            self.backend.put_secret_value(
+                SecretId="db", ClientRequestToken="v2", SecretString="other",
+                VersionStages=[AWSPENDING])
+        self.assertEqual(ctx.exception.code, "ResourceExistsException")
+
+    def test_moving_current_sets_previous(self):
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="v2", SecretString="new",
+            VersionStages=[AWSPENDING])
+        self.backend.update_secret_version_stage(
+            SecretId="db", VersionStage=AWSCURRENT, MoveToVersionId="v2",
+            RemoveFromVersionId="v1")
+        self.assertEqual(self.stages("v1"), [AWSPREVIOUS])
+        self.assertIn(AWSCURRENT, self.stages("v2"))
+
+    def test_move_requires_remove_from_current_holder(self):
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="v2", SecretString="new",
+            VersionStages=[AWSPENDING])
+        with self.assertRaises(SecretsBackendError) as ctx:
+            self.backend.update_secret_version_stage(
+                SecretId="db", VersionStage=AWSCURRENT, MoveToVersionId="v2")
+        self.assertEqual(ctx.exception.code, "InvalidParameterException")
+
+    def test_deprecated_versions_are_hidden_by_default(self):
+        for i in range(2, 5):
+            self.backend.put_secret_value(
+                SecretId="db", ClientRequestToken=f"v{i}",
+                SecretString=str(i))
+        listed = self.backend.list_secret_version_ids(SecretId="db")
+        self.assertEqual([v["VersionId"] for v in listed["Versions"]],
+                         ["v3", "v4"])
+        listed = self.backend.list_secret_version_ids(
+            SecretId="db", IncludeDeprecated=True, MaxResults=3)
+        self.assertEqual(len(listed["Versions"]), 3)
+        self.assertIn("NextToken", listed)
+
+    def test_unknown_secret(self):
+        with self.assertRaises(SecretsBackendError) as ctx:
+            self.backend.get_secret_value(SecretId="missing")
+        self.assertEqual(ctx.exception.code, "ResourceNotFoundException")
+
+
+class CountingBackend(InMemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get_secret_value(self, **kwargs):
+        self.gets += 1
+        return super().get_secret_value(**kwargs)
+
+
+class CachingBackendTestSuite(unittest.TestCase):
+    """LRU+TTL version cache."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.inner = CountingBackend()
+        self.inner.create_secret(Name="db", SecretString="old",
+                                 ClientRequestToken="v1")
+        self.cache = VersionCache(maxsize=2, ttl=10,
+                                  clock=lambda: self.now)
+        self.backend = CachingBackend(self.inner, self.cache)
+
+    def get(self, version_id, secret_id="db"):
+        return self.backend.get_secret_value(
+            SecretId=secret_id, VersionId=version_id)["SecretString"]
+
+    def test_put_populates_cache(self):
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="v2", SecretString="new",
+            VersionStages=[AWSPENDING])
+        self.assertEqual(self.get("v2"), "new")
+        self.assertEqual(self.get("v2"), "new")
+        self.assertEqual(self.inner.gets, 0)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_read_through_and_ttl(self):
+        self.assertEqual(self.get("v1"), "old")
+        self.assertEqual(self.get("v1"), "old")
+        self.assertEqual(self.inner.gets, 1)
+        self.now = 10
+        self.get("v1")
+        self.assertEqual(self.inner.gets, 2)
+
+    def test_lru_eviction(self):
+        for i in (2, 3):
+            self.backend.put_secret_value(
+                SecretId="db", ClientRequestToken=f"v{i}",
+                SecretString=str(i), VersionStages=[f"label-{i}"])
+        self.get("v2")
+        self.get("v1")
+        self.assertEqual(len(self.cache), 2)
+        self.get("v2")
+        self.assertEqual(self.inner.gets, 1)
+        self.get("v3")
+        self.assertEqual(self.inner.gets, 2)
+
+    def test_stage_update_invalidates(self):
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="v2", SecretString="new",
+            VersionStages=[AWSPENDING])
+        self.backend.update_secret_version_stage(
+            SecretId="db", VersionStage=AWSCURRENT, MoveToVersionId="v2",
+            RemoveFromVersionId="v1")
+        self.assertEqual(len(self.cache), 0)
+        response = self.backend.get_secret_value(SecretId="db",
+                                                 VersionId="v2")
+        self.assertIn(AWSCURRENT, response["VersionStages"])
+
+    def test_stage_lookups_bypass_cache(self):
+        self.get("v1")
+        self.backend.get_secret_value(SecretId="db")
+        self.assertEqual(self.inner.gets, 2)
+
+    def test_coroutine_backend(self):
+        backend = CachingBackend(ThreadedAsyncBackend(self.inner), self.cache)
+
+        async def run():
+            await backend.put_secret_value(
+                SecretId="db", ClientRequestToken="v2", SecretString="new",
+                VersionStages=[AWSPENDING])
+            # a hit is returned as is, a miss is awaited
+            hit = backend.get_secret_value(SecretId="db", VersionId="v2")
+            miss = await backend.get_secret_value(SecretId="db",
+                                                  VersionId="v1")
+            await backend.update_secret_version_stage(
+                SecretId="db", VersionStage=AWSCURRENT, MoveToVersionId="v2",
+                RemoveFromVersionId="v1")
+            return hit, miss
+
+        hit, miss = asyncio.run(run())
+        self.assertEqual(hit["SecretString"], "new")
+        self.assertEqual(miss["SecretString"], "old")
+        self.assertEqual(self.inner.gets, 1)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
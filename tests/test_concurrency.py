@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import unittest
+
+from sample.backends import SecretsBackendError
+from sample.concurrency import AIMDLimit
+from sample.metrics import Metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AIMDLimitTestSuite(unittest.TestCase):
+    """Additive increase, multiplicative decrease concurrency limit."""
+
+    def test_grows_by_one_per_window(self):
+        limit = AIMDLimit(initial=4)
+        for _ in range(4):
+            limit.record(0.1)
+        self.assertEqual(limit.limit, 4)
+        limit.record(0.1)
+        self.assertEqual(limit.limit, 5)
+
+    def test_throttling_halves_once_per_window(self):
+        limit = AIMDLimit(initial=16)
+        throttled = SecretsBackendError("ThrottlingException")
+        for _ in range(16):
+            limit.record(0.1, throttled)
+        self.assertEqual(limit.limit, 8)
+        self.assertEqual(limit.decreases, 1)
+        limit.record(0.1, throttled)
+        self.assertEqual(limit.limit, 4)
+
+    def test_other_errors_do_not_change_limit(self):
+        limit = AIMDLimit(initial=4)
+        limit.record(0.1, SecretsBackendError("ResourceNotFoundException"))
+        self.assertEqual(limit.limit, 4)
+        self.assertEqual(limit.decreases, 0)
+
+    def test_latency_spike_decreases(self):
+        limit = AIMDLimit(initial=8, latency_tolerance=2.0)
+        limit.record(0.1)
+        limit.record(0.15)
+        self.assertEqual(limit.decreases, 0)
+        limit.record(0.5)
+        self.assertEqual(limit.limit, 4)
+
+    def test_bounds(self):
+        limit = AIMDLimit(initial=2, min_limit=2, max_limit=3)
+        for _ in range(10):
+            limit.record(0.1)
+        self.assertEqual(limit.limit, 3)
+        for _ in range(10):
+            limit.record(0.1, SecretsBackendError("CircuitOpen"))
+        self.assertEqual(limit.limit, 2)
+        with self.assertRaises(ValueError):
+            AIMDLimit(initial=1, min_limit=2)
+
+    def test_throughput_and_gauges(self):
+        clock = Clock()
+        metrics = Metrics(enabled=True)
+        limit = AIMDLimit(initial=4, window=10, metrics=metrics, clock=clock)
+        for i in range(20):
+            clock.now = i / 2
+            limit.record(0.1)
+        self.assertAlmostEqual(limit.throughput(), 20 / 9.5)
+        clock.now = 30
+        self.assertEqual(limit.throughput(), 0.0)
+
+        bulk = metrics.snapshot()["Bulk"]["rotate_many"]
+        self.assertEqual(bulk["ConcurrencyLimit"], limit.limit)
+        self.assertIn("RotationsPerSecond", bulk)
+        line = metrics.emf_lines(timestamp=0)[0]
+        self.assertIn('"Unit": "Count/Second"', line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import base64
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sample import rotate
+from sample.backends import InMemoryBackend, ThreadedAsyncBackend
+from sample.connectors import (ConnectionPool, ConnectorError,
+                               ElasticsearchConnector, ReplicatedConnector)
+
+ADMIN = ("elastic", "changeme")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """The two Elasticsearch security endpoints used by the connector."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # like real servers, or Nagle holds the body back behind the headers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def credentials(self):
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Basic "):
+            return None
+        return tuple(base64.b64decode(header[6:]).decode().split(":", 1))
+
+    def reply(self, status, document):
+        body = json.dumps(document).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_connections:
+            # hang up without announcing it, like an idle timeout would
+            self.close_connection = True
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(
+            int(self.headers["Content-Length"])))
+        parts = self.path.split("/")
+        if self.credentials() != ADMIN:
+            return self.reply(401, {"error": "unauthorized"})
+        if parts[1:3] != ["_security", "user"] or parts[4] != "_password":
+            return self.reply(404, {"error": "not found"})
+        self.server.passwords[parts[3]] = body["password"]
+        self.reply(200, {})
+
+    def do_GET(self):
+        credentials = self.credentials()
+        if (self.path == "/_security/_authenticate" and credentials
+                and self.server.passwords.get(credentials[0])
+                == credentials[1]):
+            return self.reply(200, {"username": credentials[0]})
+        self.reply(401, {"error": "unauthorized"})
+
+
+class StandInServer:
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.passwords = {}
+        self.server.drop_connections = False
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.05,))
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f"http://{host}:{port}"
+        return self.server
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class ElasticsearchConnectorTestSuite(unittest.TestCase):
+    """Password changes over pooled keep-alive connections."""
+
+    def setUp(self):
+        self.stand_in = StandInServer()
+        self.server = self.stand_in.__enter__()
+        self.addCleanup(self.stand_in.__exit__, None, None, None)
+        self.pool = ConnectionPool("http", *self.server.server_address)
+        self.addCleanup(self.pool.close)
+        self.connector = ElasticsearchConnector(
+            self.stand_in.url, auth=ADMIN, pool=self.pool)
+
+    def test_reuses_one_connection(self):
+        for i in range(10):
+            self.connector.set_password(SecretId=f"user{i}",
+                                        Password=f"pw{i}")
+        self.assertEqual(self.server.passwords["user7"], "pw7")
+        self.assertEqual(self.pool.opened, 1)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_test_password(self):
+        self.connector.set_password(SecretId="kibana", Password="new")
+        self.assertTrue(self.connector.test_password(SecretId="kibana",
+                                                     Password="new"))
+        self.assertFalse(self.connector.test_password(SecretId="kibana",
+                                                      Password="old"))
+
+    def test_rejected(self):
+        connector = ElasticsearchConnector(
+            self.stand_in.url, auth=("elastic", "wrong"), pool=self.pool)
+        with self.assertRaises(ConnectorError) as ctx:
+            connector.set_password(SecretId="kibana", Password="new")
+        self.assertEqual(ctx.exception.status, 401)
+        self.assertNotIn("new", str(ctx.exception))
+
+    def test_reconnects_after_server_hangs_up(self):
+        self.server.drop_connections = True
+        for i in range(3):
+            self.connector.set_password(SecretId="kibana", Password=f"{i}")
+        self.assertEqual(self.server.passwords["kibana"], "2")
+        self.assertEqual(self.pool.opened, 3)
+
+
+class Replica:
+    """Answers `test_password` with `answer` after `delay` seconds."""
+
+    def __init__(self, delay=0.0, answer=True):
+        self.delay = delay
+        self.answer = answer
+        self.passwords = {}
+
+    def set_password(self, *, SecretId, Password):
+        self.passwords[SecretId] = Password
+
+    def test_password(self, *, SecretId, Password):
+        time.sleep(self.delay)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+class ReplicatedConnectorTestSuite(unittest.TestCase):
+    """Concurrent probes with quorum and early answers."""
+
+    def probe(self, replicas, **kwargs):
+        connector = ReplicatedConnector(replicas, **kwargs)
+        self.addCleanup(connector.close)
+        start = time.monotonic()
+        ok = connector.test_password(SecretId="db", Password="new")
+        return ok, time.monotonic() - start
+
+    def test_probes_run_concurrently(self):
+        ok, elapsed = self.probe([Replica(0.1) for _ in range(5)])
+        self.assertTrue(ok)
+        self.assertLess(elapsed, 0.3)
+
+    def test_quorum_answers_before_slow_replicas(self):
+        replicas = [Replica(0.02), Replica(0.02), Replica(0.02),
+                    Replica(1.0), Replica(1.0)]
+        ok, elapsed = self.probe(replicas, quorum=3)
+        self.assertTrue(ok)
+        self.assertLess(elapsed, 0.5)
+
+    def test_fails_early_once_quorum_is_out_of_reach(self):
+        replicas = [Replica(answer=False), Replica(answer=ConnectorError(401)),
+                    Replica(1.0), Replica(1.0)]
+        ok, elapsed = self.probe(replicas, quorum=3)
+        self.assertFalse(ok)
+        self.assertLess(elapsed, 0.5)
+
+    def test_probe_timeout(self):
+        ok, elapsed = self.probe([Replica(), Replica(1.0)],
+                                 probe_timeout=0.1)
+        self.assertFalse(ok)
+        self.assertLess(elapsed, 0.5)
+
+    def test_queued_probes_keep_their_timeout(self):
+        # six rotations checking two replicas through two probe threads,
+        # most probes wait longer than the timeout before they run
+        connector = ReplicatedConnector([Replica(0.05), Replica(0.05)],
+                                        probe_timeout=0.1, max_workers=2,
+                                        queue_timeout=5.0)
+        self.addCleanup(connector.close)
+        results = []
+
+        def verify():
+            results.append(connector.test_password(SecretId="db",
+                                                   Password="new"))
+
+        threads = [threading.Thread(target=verify) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [True] * 6)
+
+    def test_hung_replica_cannot_block_later_calls(self):
+        # probes left behind on the hung replica hold every thread by the
+        # fourth call, whose probes then never start
+        hung = threading.Event()
+        self.addCleanup(hung.set)
+
+        class Hung(Replica):
+            def test_password(self, **kwargs):
+                hung.wait(10)
+                return True
+
+        connector = ReplicatedConnector([Replica(), Replica(), Hung()],
+                                        quorum=2, max_workers=3,
+                                        queue_timeout=0.2)
+        self.addCleanup(connector.close)
+        for _ in range(3):
+            self.assertTrue(connector.test_password(SecretId="db",
+                                                    Password="new"))
+        start = time.monotonic()
+        self.assertFalse(connector.test_password(SecretId="db",
+                                                 Password="new"))
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_connectors_have_their_own_probe_pools(self):
+        first = ReplicatedConnector([Replica(), Replica()])
+        second = ReplicatedConnector([Replica()], max_workers=1)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        self.assertIsNot(first._probes(), second._probes())
+        self.assertEqual(first.max_workers, 8)
+
+    def test_sets_password_on_first_replica(self):
+        replicas = [Replica(), Replica()]
+        ReplicatedConnector(replicas).set_password(SecretId="db",
+                                                   Password="new")
+        self.assertEqual(replicas[0].passwords, {"db": "new"})
+        self.assertEqual(replicas[1].passwords, {})
+
+    def test_quorum_bounds(self):
+        with self.assertRaises(ValueError):
+            ReplicatedConnector([Replica()], quorum=2)
+        with self.assertRaises(ValueError):
+            ReplicatedConnector([])
+
+
+class RotationConnectorTestSuite(unittest.TestCase):
+    """setSecret and testSecret calling the configured connector."""
+
+    def setUp(self):
+        self.stand_in = StandInServer()
+        self.server = self.stand_in.__enter__()
+        self.addCleanup(self.stand_in.__exit__, None, None, None)
+        self.pool = ConnectionPool("http", *self.server.server_address)
+        self.addCleanup(self.pool.close)
+        rotate.connector = ElasticsearchConnector(
+            self.stand_in.url, auth=ADMIN, pool=self.pool)
+        self.addCleanup(setattr, rotate, "connector", None)
+        self.backend = InMemoryBackend()
+        for name in ("alice", "bob", "carol"):
+            self.backend.create_secret(Name=name, SecretString="old")
+
+    def current(self, name):
+        return self.backend.get_secret_value(SecretId=name)["SecretString"]
+
+    def test_rotate_many(self):
+        report = rotate.rotate_many(["alice", "bob", "carol"],
+                                    backend=self.backend, max_workers=1)
+        self.assertEqual(len(report.succeeded), 3)
+        for name in ("alice", "bob", "carol"):
+            self.assertEqual(self.server.passwords[name], self.current(name))
+        self.assertEqual(self.server.connections, 1)
+
+    def test_rejected_password_fails_test_step(self):
+        class Forgetful(ElasticsearchConnector):
+            def test_password(self, **kwargs):
+                return False
+
+        rotate.connector = Forgetful(self.stand_in.url, auth=ADMIN,
+                                     pool=self.pool)
+        result = rotate.rotate_secret("alice", backend=self.backend)
+        self.assertEqual(result.failed_step, "testSecret")
+        self.assertEqual(self.current("alice"), "old")
+
+    def test_async(self):
+        result = asyncio.run(rotate.rotate_secret_async(
+            "bob", backend=ThreadedAsyncBackend(self.backend)))
+        self.assertTrue(result.ok)
+        self.assertEqual(self.server.passwords["bob"], self.current("bob"))
+
+
+if __name__ == '__main__':
+    unittest.main()
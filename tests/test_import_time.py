@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# cumulative import budget in microseconds, generous enough to absorb noisy
+# CI machines while still catching an eager boto3 import (well over 100ms).
+BUDGET_US = int(os.environ.get("SAMPLE_IMPORT_BUDGET_US", "60000"))
+
+
+def import_times(module):
+    """Run `python -X importtime` in a fresh interpreter and parse the output
+    into a mapping of module name to cumulative microseconds."""
+    code = (
+        f"import sys, {module}; "
+        "print(','.join(sorted(m for m in sys.modules)))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times, set(proc.stdout.strip().split(","))
+
+
+class ImportTimeTestSuite(unittest.TestCase):
+    """Cold-start import budget."""
+
+    def test_rotate_does_not_import_boto3(self):
+        _, modules = import_times("sample.rotate")
+        self.assertNotIn("boto3", modules)
+        self.assertNotIn("botocore", modules)
+
+    def test_import_budget(self):
+        for module in ("sample", "sample.rotate"):
+            times, _ = import_times(module)
+            self.assertLess(times[module], BUDGET_US, module)
+
+
+if __name__ == '__main__':
+    unittest.main()
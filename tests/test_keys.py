@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import importlib.util
+import json
+import unittest
+
+from sample import keys, rotate
+from sample.backends import InMemoryBackend, ThreadedAsyncBackend
+
+HAS_CRYPTOGRAPHY = importlib.util.find_spec("cryptography") is not None
+
+
+class SecretStringTestSuite(unittest.TestCase):
+    """New secret values by secret type."""
+
+    def test_password(self):
+        value = keys.generate_secret_string(keys.PASSWORD)
+        self.assertEqual(len(value), 32)
+        self.assertTrue(value.isalnum())
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            keys.generate_secret_string("dsa")
+
+
+@unittest.skipUnless(HAS_CRYPTOGRAPHY, "cryptography is not installed")
+class KeyPairTestSuite(unittest.TestCase):
+    """RSA and Ed25519 key pairs, generated on a process pool."""
+
+    def tearDown(self):
+        keys.shutdown_key_pool()
+
+    def load(self, key_pair):
+        from cryptography.hazmat.primitives import serialization
+
+        private_key = serialization.load_pem_private_key(
+            key_pair["PrivateKey"].encode(), password=None)
+        public_key = serialization.load_ssh_public_key(
+            key_pair["PublicKey"].encode())
+        self.assertEqual(public_key.public_bytes(
+            serialization.Encoding.OpenSSH,
+            serialization.PublicFormat.OpenSSH),
+            private_key.public_key().public_bytes(
+                serialization.Encoding.OpenSSH,
+                serialization.PublicFormat.OpenSSH))
+        return private_key
+
+    def test_rsa(self):
+        private_key = self.load(keys.generate_key_pair(keys.RSA, 2048))
+        self.assertEqual(private_key.key_size, 2048)
+
+    def test_pool(self):
+        key_pairs = keys.generate_key_pairs(3, keys.ED25519, processes=1)
+        self.assertEqual(len({kp["PrivateKey"] for kp in key_pairs}), 3)
+        for key_pair in key_pairs:
+            self.assertEqual(key_pair["KeyType"], keys.ED25519)
+            self.load(key_pair)
+
+    def test_rotation(self):
+        backend = InMemoryBackend()
+        backend.create_secret(Name="ssh", SecretString="{}")
+        result = rotate.rotate_secret("ssh", backend=backend,
+                                      secret_type=keys.ED25519)
+        self.assertTrue(result.ok)
+        current = backend.get_secret_value(SecretId="ssh")
+        self.load(json.loads(current["SecretString"]))
+
+    def test_every_driver_takes_the_secret_type(self):
+        backend = InMemoryBackend()
+        backend.create_secret(Name="ssh", SecretString="{}")
+        async_backend = ThreadedAsyncBackend(backend)
+        kwargs = {"secret_type": keys.ED25519}
+        drivers = [
+            lambda: rotate.rotate_many(["ssh"], backend, **kwargs),
+            lambda: rotate.rotate_many_pipelined(["ssh"], backend, 1,
+                                                 **kwargs),
+            lambda: rotate.rotate_many_adaptive(["ssh"], backend, **kwargs),
+            lambda: asyncio.run(rotate.rotate_many_async(
+                ["ssh"], async_backend, **kwargs)),
+            lambda: asyncio.run(rotate.rotate_many_adaptive_async(
+                ["ssh"], async_backend, **kwargs)),
+        ]
+        for driver in drivers:
+            report = driver()
+            self.assertEqual(report.failed, [])
+            current = backend.get_secret_value(SecretId="ssh")
+            key_pair = json.loads(current["SecretString"])
+            self.assertEqual(key_pair["KeyType"], keys.ED25519)
+        result = asyncio.run(rotate.rotate_secret_async(
+            "ssh", async_backend, **kwargs))
+        self.assertTrue(result.ok, result.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
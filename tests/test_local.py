@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import contextlib
+import io
+import json
+import unittest
+
+from sample.backends import AWSCURRENT, InMemoryBackend
+from sample.local import main, rotate_locally
+
+
+class CallCountingBackend(InMemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def put_secret_value(self, **kwargs):
+        self.calls.append("put_secret_value")
+        return super().put_secret_value(**kwargs)
+
+    def get_secret_value(self, **kwargs):
+        self.calls.append("get_secret_value")
+        return super().get_secret_value(**kwargs)
+
+    def list_secret_version_ids(self, **kwargs):
+        self.calls.append("list_secret_version_ids")
+        return super().list_secret_version_ids(**kwargs)
+
+    def update_secret_version_stage(self, **kwargs):
+        self.calls.append("update_secret_version_stage")
+        return super().update_secret_version_stage(**kwargs)
+
+
+class LocalRotationTestSuite(unittest.TestCase):
+    """All four steps in one process."""
+
+    def setUp(self):
+        self.backend = CallCountingBackend()
+        self.backend.create_secret(Name="db", SecretString="old")
+
+    def test_steps_do_not_read_back_created_value(self):
+        result = rotate_locally("db", token="v2", backend=self.backend)
+        self.assertTrue(result.ok)
+        self.assertEqual(self.backend.calls, [
+            "put_secret_value", "list_secret_version_ids",
+            "update_secret_version_stage"])
+        current = self.backend.get_secret_value(SecretId="db")
+        self.assertEqual(current["VersionId"], "v2")
+        self.assertIn(AWSCURRENT, current["VersionStages"])
+
+    def test_replay_reads_existing_version(self):
+        rotate_locally("db", token="v2", backend=self.backend)
+        self.backend.calls.clear()
+        result = rotate_locally("db", token="v2", backend=self.backend)
+        self.assertTrue(result.ok)
+        self.assertIn("get_secret_value", self.backend.calls)
+        self.assertNotIn("update_secret_version_stage", self.backend.calls)
+
+    def test_main(self):
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            code = main(["db", "missing"], backend=self.backend)
+        self.assertEqual(code, 1)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(line["secret_id"], line["ok"]) for line in lines],
+                         [("db", True), ("missing", False)])
+        self.assertEqual(lines[1]["failed_step"], "createSecret")
+        records = [json.loads(line) for line in err.getvalue().splitlines()]
+        self.assertIn("executing create step",
+                      [record["message"] for record in records])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import io
+import json
+import unittest
+
+from sample import logs
+
+
+class Unformattable:
+    formatted = 0
+
+    def __str__(self):
+        Unformattable.formatted += 1
+        return "formatted"
+
+
+class StructuredLoggerTestSuite(unittest.TestCase):
+    """Buffered JSON logging."""
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.logger = logs.StructuredLogger(
+            "test", level=logs.INFO,
+            writer=logs.BufferedWriter(self.stream, interval=60))
+
+    def records(self):
+        self.assertTrue(self.logger.flush(timeout=5))
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_lines(self):
+        self.logger.info("rotated %s", "db", secret_id="db", attempt=2)
+        record, = self.records()
+        self.assertEqual(record["message"], "rotated db")
+        self.assertEqual(record["level"], "INFO")
+        self.assertEqual(record["logger"], "test")
+        self.assertEqual(record["secret_id"], "db")
+        self.assertEqual(record["attempt"], 2)
+        self.assertTrue(record["timestamp"].endswith("Z"))
+
+    def test_level_gating_skips_formatting(self):
+        Unformattable.formatted = 0
+        self.logger.debug("value %s", Unformattable())
+        self.assertEqual(self.records(), [])
+        self.assertEqual(Unformattable.formatted, 0)
+
+    def test_redaction(self):
+        self.logger.warning("set", password="hunter2", SecretString="s3cr3t",
+                            secret_id="db")
+        record, = self.records()
+        self.assertEqual(record["password"], logs.REDACTED)
+        self.assertEqual(record["SecretString"], logs.REDACTED)
+        self.assertEqual(record["secret_id"], "db")
+        self.assertNotIn("hunter2", self.stream.getvalue())
+
+    def test_buffer_is_written_in_batches(self):
+        for i in range(500):
+            self.logger.info("event %d", i)
+        records = self.records()
+        self.assertEqual([r["message"] for r in records],
+                         [f"event {i}" for i in range(500)])
+
+    def test_get_logger_shares_one_writer(self):
+        first = logs.get_logger("sample.first")
+        second = logs.get_logger("sample.second")
+        self.assertIs(first.writer, second.writer)
+        self.assertIs(first.writer, logs.shared_writer)
+
+        stream = io.StringIO()
+        logs.shared_writer.flush(timeout=5)
+        logs.shared_writer.stream = stream
+        self.addCleanup(setattr, logs.shared_writer, "stream", None)
+        first.info("one")
+        second.info("two")
+        self.assertTrue(first.flush(timeout=5))
+        self.assertEqual(
+            [json.loads(line)["message"]
+             for line in stream.getvalue().splitlines()], ["one", "two"])
+
+    def test_level_from_name(self):
+        logger = logs.StructuredLogger("test", "warning")
+        self.assertFalse(logger.enabled_for(logs.INFO))
+        self.assertTrue(logger.enabled_for(logs.ERROR))
+
+    def test_level_aliases_and_numbers(self):
+        for level, expected in (("WARN", logs.WARNING),
+                                ("CRITICAL", logs.CRITICAL),
+                                ("fatal", logs.CRITICAL), ("30", 30),
+                                (" debug ", logs.DEBUG), (40, 40)):
+            logger = logs.StructuredLogger("test", level)
+            self.assertEqual(logger.level, expected, level)
+
+    def test_unknown_level_falls_back_to_info(self):
+        stream = io.StringIO()
+        logger = logs.StructuredLogger(
+            "test", "LOUD", writer=logs.BufferedWriter(stream))
+        self.assertEqual(logger.level, logs.INFO)
+        self.assertTrue(logger.flush(timeout=5))
+        record = json.loads(stream.getvalue())
+        self.assertEqual(record["level"], "WARNING")
+        self.assertEqual(record["log_level"], "LOUD")
+
+
+if __name__ == '__main__':
+    unittest.main()
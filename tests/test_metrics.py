@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import io
+import json
+import unittest
+
+from sample import rotate
+from sample.backends import (CachingBackend, InMemoryBackend,
+                             SecretsBackendError, ThreadedAsyncBackend,
+                             VersionCache)
+from sample.metrics import Histogram, InstrumentedBackend, Metrics
+from sample.resilience import (RateLimitedBackend, ResilientBackend,
+                               RetryPolicy)
+
+
+class HistogramTestSuite(unittest.TestCase):
+    """Log-linear latency histogram."""
+
+    def test_percentiles_within_bucket_error(self):
+        histogram = Histogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+        self.assertEqual(histogram.count, 1000)
+        for q in (50, 90, 99):
+            self.assertAlmostEqual(histogram.percentile(q), q / 100,
+                                   delta=q / 100 * 0.125)
+        self.assertEqual(histogram.max, 1.0)
+
+    def test_empty(self):
+        self.assertEqual(Histogram().percentile(99), 0.0)
+
+
+class MetricsTestSuite(unittest.TestCase):
+    """Step and backend call instrumentation."""
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.create_secret(Name="db", SecretString="old")
+        rotate.metrics.reset()
+        rotate.metrics.enabled = True
+        self.addCleanup(setattr, rotate.metrics, "enabled", False)
+        self.addCleanup(rotate.metrics.reset)
+
+    def test_steps_and_calls_are_timed(self):
+        rotate.rotate_secret("db", backend=self.backend)
+        snapshot = rotate.metrics.snapshot()
+        self.assertEqual(set(snapshot["Step"]), set(rotate.ROTATION_STEPS))
+        self.assertEqual(snapshot["Operation"]["get_secret_value"]["count"],
+                         2)
+        self.assertEqual(
+            snapshot["Operation"]["update_secret_version_stage"]["count"], 1)
+
+    def test_cache_hits_are_not_timed(self):
+        backend = CachingBackend(self.backend, VersionCache())
+        rotate.rotate_secret("db", backend=backend)
+        operations = rotate.metrics.snapshot()["Operation"]
+        # setSecret and testSecret read the version createSecret cached
+        self.assertNotIn("get_secret_value", operations)
+        self.assertEqual(operations["put_secret_value"]["count"], 1)
+
+    def test_cache_hits_are_not_timed_async(self):
+        backend = ThreadedAsyncBackend(
+            CachingBackend(self.backend, VersionCache()))
+        asyncio.run(rotate.rotate_secret_async("db", backend=backend))
+        operations = rotate.metrics.snapshot()["Operation"]
+        self.assertNotIn("get_secret_value", operations)
+        self.assertEqual(operations["put_secret_value"]["count"], 1)
+
+    def test_waits_and_backoff_are_not_timed(self):
+        class Throttled(InMemoryBackend):
+            calls = 0
+
+            def put_secret_value(self, **kwargs):
+                self.calls += 1
+                if self.calls == 1:
+                    raise SecretsBackendError("ThrottlingException")
+                return super().put_secret_value(**kwargs)
+
+        class Slow:
+            def reserve(self, operation):
+                return 0.1
+
+        backend = Throttled()
+        backend.create_secret(Name="db", SecretString="old")
+        stack = ResilientBackend(
+            RateLimitedBackend(backend, limiter=Slow()),
+            endpoint="test-metrics",
+            policy=RetryPolicy(base_delay=0.1, max_delay=0.1),
+            metrics=rotate.metrics)
+        rotate.rotate_secret("db", backend=stack)
+        put = rotate.metrics.snapshot()["Operation"]["put_secret_value"]
+        # both attempts, each timed without its token wait or the backoff
+        self.assertEqual(put["count"], 2)
+        self.assertEqual(put["ErrorsThrottlingException"], 1)
+        self.assertLess(put["max"], 0.05)
+        self.assertEqual(put["Retries"], 1)
+
+    def test_errors_are_counted(self):
+        backend = InstrumentedBackend(self.backend, rotate.metrics)
+        with self.assertRaises(Exception):
+            backend.get_secret_value(SecretId="missing")
+        operation = rotate.metrics.snapshot()["Operation"]["get_secret_value"]
+        self.assertEqual(operation["ErrorsResourceNotFoundException"], 1)
+
+    def test_emf_lines(self):
+        rotate.rotate_secret("db", backend=self.backend)
+        stream = io.StringIO()
+        rotate.metrics.flush(stream)
+        documents = [json.loads(line)
+                     for line in stream.getvalue().splitlines()]
+        create, = [d for d in documents if d.get("Step") == "createSecret"]
+        directive = create["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(directive["Dimensions"], [["Step"]])
+        names = [m["Name"] for m in directive["Metrics"]]
+        self.assertIn("LatencyP99", names)
+        for name in names:
+            self.assertIn(name, create)
+        self.assertEqual(rotate.metrics.snapshot(), {})
+
+    def test_disabled_records_nothing(self):
+        rotate.metrics.enabled = False
+        rotate.rotate_secret("db", backend=self.backend)
+        self.assertEqual(rotate.metrics.snapshot(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import unittest
+
+from sample import passwords
+
+
+class PasswordTestSuite(unittest.TestCase):
+    """CSPRNG password generation."""
+
+    def test_length_and_alphabet(self):
+        for length in (0, 1, 16, 4096):
+            pwd = passwords.generate_password(length)
+            self.assertEqual(len(pwd), length)
+            self.assertTrue(set(pwd) <= set(passwords.ALPHANUMERIC))
+
+    def test_every_character_is_reachable(self):
+        pwd = passwords.generate_password(20000)
+        self.assertEqual(set(pwd), set(passwords.ALPHANUMERIC))
+
+    def test_custom_alphabet(self):
+        pwd = passwords.random_string(500, "ab")
+        self.assertEqual(set(pwd), {"a", "b"})
+
+    def test_translation_is_unbiased(self):
+        for alphabet in (passwords.ALPHANUMERIC, "abc", passwords.DIGITS):
+            table, delete, accepted = passwords._translation(alphabet)
+            counts = {c: table[:accepted].count(ord(c)) for c in alphabet}
+            self.assertEqual(len(set(counts.values())), 1)
+            self.assertEqual(len(delete), 256 - accepted)
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            passwords.generate_password(-1)
+        for alphabet in ("", "aa", "é"):
+            with self.assertRaises(ValueError):
+                passwords.random_string(8, alphabet)
+
+    def test_rotate_reexports_generate_password(self):
+        from sample import rotate
+
+        self.assertIs(rotate.generate_password, passwords.generate_password)
+
+
+class BatchPasswordTestSuite(unittest.TestCase):
+    """Batch password generation."""
+
+    def test_list(self):
+        pwds = passwords.generate_passwords(1000, 24)
+        self.assertEqual(len(pwds), 1000)
+        self.assertTrue(all(len(p) == 24 for p in pwds))
+        self.assertEqual(len(set(pwds)), 1000)
+
+    def test_lazy(self):
+        pwds = passwords.generate_passwords(10, 8, alphabet="xyz", lazy=True,
+                                            chunk_size=3)
+        self.assertNotIsInstance(pwds, list)
+        pwds = list(pwds)
+        self.assertEqual(len(pwds), 10)
+        self.assertTrue(all(set(p) <= set("xyz") for p in pwds))
+
+    def test_edge_cases(self):
+        self.assertEqual(passwords.generate_passwords(0, 16), [])
+        self.assertEqual(passwords.generate_passwords(3, 0), ["", "", ""])
+        with self.assertRaises(ValueError):
+            passwords.generate_passwords(-1, 16)
+
+
+class PasswordPolicyTestSuite(unittest.TestCase):
+    """Constructive password policies."""
+
+    def test_minimums_are_met(self):
+        policy = passwords.PasswordPolicy(
+            min_lowercase=3, min_uppercase=3, min_digits=3, min_symbols=3,
+            symbols=passwords.SYMBOLS, exclude=passwords.AMBIGUOUS)
+        for _ in range(200):
+            pwd = passwords.generate_password(12, policy=policy)
+            self.assertEqual(len(pwd), 12)
+            self.assertEqual(sum(c in passwords.LOWERCASE for c in pwd), 3)
+            self.assertEqual(sum(c in passwords.UPPERCASE for c in pwd), 3)
+            self.assertEqual(sum(c in passwords.DIGITS for c in pwd), 3)
+            self.assertEqual(sum(c in passwords.SYMBOLS for c in pwd), 3)
+            self.assertFalse(set(pwd) & set(passwords.AMBIGUOUS))
+
+    def test_no_repeats(self):
+        policy = passwords.PasswordPolicy(min_digits=10, no_repeats=True)
+        for _ in range(50):
+            pwd = policy.generate(62)
+            self.assertEqual(len(set(pwd)), 62)
+        with self.assertRaises(ValueError):
+            policy.generate(63)
+
+    def test_shuffle_is_unbiased(self):
+        # the required digit must land on each position equally often
+        policy = passwords.PasswordPolicy(min_digits=1, symbols="",
+                                          exclude=passwords.DIGITS[1:])
+        counts = [0] * 4
+        for _ in range(4000):
+            pwd = policy.generate(4)
+            counts[pwd.index("0")] += 1 if pwd.count("0") == 1 else 0
+        self.assertTrue(all(c > 600 for c in counts), counts)
+
+    def test_impossible_policies(self):
+        with self.assertRaises(ValueError):
+            passwords.PasswordPolicy(min_symbols=1)
+        with self.assertRaises(ValueError):
+            passwords.PasswordPolicy(min_digits=11, no_repeats=True)
+        with self.assertRaises(ValueError):
+            passwords.PasswordPolicy(min_digits=4).generate(3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import importlib.util
+import threading
+import time
+import types
+import unittest
+
+from sample import rotate
+from sample.backends import (InMemoryBackend, SecretsBackendError,
+                             ThreadedAsyncBackend)
+from sample.metrics import Metrics
+from sample.regions import RegionError, RegionFanOut
+
+
+class Replica:
+    """A region's view of the primary secret, answering after `delay`."""
+
+    def __init__(self, primary, delay=0.0):
+        self.primary = primary
+        self.delay = delay
+
+    def get_secret_value(self, **kwargs):
+        time.sleep(self.delay)
+        return self.primary.get_secret_value(**kwargs)
+
+
+class RegionalService:
+    """The copy of the target service running in one region."""
+
+    def __init__(self, delay=0.0, accept=True):
+        self.delay = delay
+        self.accept = accept
+        self.passwords = {}
+        self.lock = threading.Lock()
+
+    def set_password(self, *, SecretId, Password):
+        time.sleep(self.delay)
+        with self.lock:
+            self.passwords[SecretId] = Password
+
+    def test_password(self, *, SecretId, Password):
+        time.sleep(self.delay)
+        return self.accept and self.passwords.get(SecretId) == Password
+
+
+REGIONS = ["eu-west-1", "us-east-1", "ap-southeast-2"]
+
+HAS_BOTO3 = importlib.util.find_spec("boto3") is not None
+
+
+class FakeClient:
+    """Secrets Manager client of one region, backed by an in-memory store."""
+
+    def __init__(self, store, region):
+        self.store = store
+        self.meta = types.SimpleNamespace(
+            endpoint_url=f"https://secretsmanager.{region}.amazonaws.com")
+
+    def __getattr__(self, operation):
+        method = getattr(self.store, operation)
+
+        def call(**kwargs):
+            from botocore.exceptions import ClientError
+
+            try:
+                return method(**kwargs)
+            except SecretsBackendError as exc:
+                raise ClientError({"Error": {"Code": exc.code}}, operation)
+
+        return call
+
+
+class RegionFanOutTestSuite(unittest.TestCase):
+    """Region-scoped step work running concurrently."""
+
+    def setUp(self):
+        self.primary = InMemoryBackend()
+        self.primary.create_secret(Name="db", SecretString="old")
+        self.services = {region: RegionalService(0.1) for region in REGIONS}
+
+    def fan_out(self, **kwargs):
+        backends = {region: Replica(self.primary, 0.1) for region in REGIONS}
+        backends.update(kwargs.pop("backends", {}))
+        return RegionFanOut(REGIONS, backends=backends,
+                            connectors=kwargs.pop("connectors",
+                                                  self.services),
+                            **kwargs)
+
+    def test_regions_run_concurrently(self):
+        fan_out = self.fan_out()
+        start = time.monotonic()
+        results = fan_out.set_password(SecretId="db", Password="new")
+        self.assertLess(time.monotonic() - start, 0.25)
+        self.assertEqual(sorted(results), sorted(REGIONS))
+        for service in self.services.values():
+            self.assertEqual(service.passwords, {"db": "new"})
+
+    def test_per_region_timings(self):
+        self.services["us-east-1"].delay = 0.3
+        metrics = Metrics(enabled=True)
+        fan_out = self.fan_out(metrics=metrics)
+        fan_out.set_password(SecretId="db", Password="new")
+        self.assertGreaterEqual(fan_out.timings["us-east-1"], 0.3)
+        self.assertLess(fan_out.timings["eu-west-1"], 0.3)
+        self.assertEqual(
+            metrics.snapshot()["Region"]["ap-southeast-2"]["count"], 1)
+
+    def test_missing_replica_version(self):
+        token = "t1"
+        self.primary.put_secret_value(SecretId="db", ClientRequestToken=token,
+                                      SecretString="new",
+                                      VersionStages=["AWSPENDING"])
+        lagging = InMemoryBackend()
+        lagging.create_secret(Name="db", SecretString="old")
+        fan_out = self.fan_out(backends={"us-east-1": lagging})
+        fan_out.set_password(SecretId="db", Password="new")
+        with self.assertRaises(RegionError) as raised:
+            fan_out.test_password(SecretId="db", VersionId=token,
+                                  Password="new")
+        self.assertEqual(list(raised.exception.failed), ["us-east-1"])
+
+    def test_rejected_in_one_region(self):
+        self.primary.put_secret_value(SecretId="db", ClientRequestToken="t1",
+                                      SecretString="new",
+                                      VersionStages=["AWSPENDING"])
+        self.services["eu-west-1"].accept = False
+        fan_out = self.fan_out()
+        fan_out.set_password(SecretId="db", Password="new")
+        with self.assertRaises(RegionError) as raised:
+            fan_out.test_password(SecretId="db", VersionId="t1",
+                                  Password="new")
+        self.assertEqual(list(raised.exception.failed), ["eu-west-1"])
+
+    def test_timeout(self):
+        self.services["ap-southeast-2"].delay = 1.0
+        fan_out = self.fan_out(timeout=0.2)
+        start = time.monotonic()
+        with self.assertRaises(RegionError) as raised:
+            fan_out.set_password(SecretId="db", Password="new")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertIsInstance(raised.exception.failed["ap-southeast-2"],
+                              TimeoutError)
+
+    def test_queued_regions_keep_their_timeout(self):
+        services = {region: RegionalService(0.2) for region in REGIONS[:2]}
+        fan_out = RegionFanOut(
+            REGIONS[:2], backends={}, connectors=services, timeout=0.5,
+            queue_timeout=5.0, max_workers=2)
+        self.addCleanup(fan_out.close)
+        errors = []
+
+        def rotation(i):
+            try:
+                fan_out.set_password(SecretId=f"s{i}", Password="new")
+            except RegionError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=rotation, args=(i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(errors, [])
+        self.assertLess(max(fan_out.timings.values()), 0.5)
+        self.assertGreater(max(fan_out.queued.values()), 0.5)
+
+    def test_queue_timeout(self):
+        services = {region: RegionalService(0.5) for region in REGIONS[:2]}
+        fan_out = RegionFanOut(
+            REGIONS[:2], backends={}, connectors=services, timeout=2.0,
+            queue_timeout=0.2, max_workers=1)
+        self.addCleanup(fan_out.close)
+        start = time.monotonic()
+        with self.assertRaises(RegionError) as raised:
+            fan_out.set_password(SecretId="db", Password="new")
+        # the first region's work, not the second one's after it
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(list(raised.exception.failed), [REGIONS[1]])
+        self.assertIn("not started", str(raised.exception))
+
+    def test_needs_regions(self):
+        with self.assertRaises(ValueError):
+            RegionFanOut([])
+
+
+class RotationRegionsTestSuite(unittest.TestCase):
+    """setSecret and testSecret fanning out to the replica regions."""
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.create_secret(Name="db", SecretString="old")
+        self.services = {region: RegionalService(0.05) for region in REGIONS}
+        rotate.regions = RegionFanOut(
+            REGIONS,
+            backends={region: Replica(self.backend, 0.05)
+                      for region in REGIONS},
+            connectors=self.services)
+        self.addCleanup(setattr, rotate, "regions", None)
+
+    def current(self):
+        return self.backend.get_secret_value(SecretId="db")["SecretString"]
+
+    def test_rotate(self):
+        result = rotate.rotate_secret("db", backend=self.backend)
+        self.assertTrue(result.ok, result.error)
+        for service in self.services.values():
+            self.assertEqual(service.passwords["db"], self.current())
+        self.assertEqual(sorted(rotate.regions.timings), sorted(REGIONS))
+
+    def test_rejected_region_fails_test_step(self):
+        self.services["us-east-1"].accept = False
+        result = rotate.rotate_secret("db", backend=self.backend)
+        self.assertEqual(result.failed_step, "testSecret")
+        self.assertIsInstance(result.error, RegionError)
+        self.assertEqual(self.current(), "old")
+
+    def test_async(self):
+        result = asyncio.run(rotate.rotate_secret_async(
+            "db", backend=ThreadedAsyncBackend(self.backend)))
+        self.assertTrue(result.ok, result.error)
+        self.assertEqual(self.services["eu-west-1"].passwords["db"],
+                         self.current())
+
+
+@unittest.skipUnless(HAS_BOTO3, "boto3 is not installed")
+class RegionClientsTestSuite(unittest.TestCase):
+    """Replica checks through the default per-region client backends."""
+
+    def setUp(self):
+        self.primary = InMemoryBackend()
+        self.primary.create_secret(Name="db", SecretString="old")
+        # us-east-1 never receives the new version
+        self.lagging = InMemoryBackend()
+        self.lagging.create_secret(Name="db", SecretString="old")
+        self.clients = {
+            "us-west-2": FakeClient(self.primary, "us-west-2"),
+            "eu-west-1": FakeClient(self.primary, "eu-west-1"),
+            "us-east-1": FakeClient(self.lagging, "us-east-1"),
+        }
+        original = rotate.get_secrets_client
+        rotate.get_secrets_client = \
+            lambda region_name=None, **kwargs: self.clients[region_name]
+        self.addCleanup(setattr, rotate, "get_secrets_client", original)
+        self.addCleanup(setattr, rotate, "regions", None)
+        self.addCleanup(rotate.version_cache.clear)
+        self.backend = rotate.client_backend(self.clients["us-west-2"])
+
+    def test_replica_is_asked(self):
+        rotate.regions = RegionFanOut(["eu-west-1", "us-east-1"])
+        result = rotate.rotate_secret("db", backend=self.backend)
+        self.assertEqual(result.failed_step, "testSecret")
+        self.assertIsInstance(result.error, RegionError)
+        self.assertEqual(list(result.error.failed), ["us-east-1"])
+
+    def test_replicated_version_passes(self):
+        rotate.regions = RegionFanOut(["eu-west-1"])
+        result = rotate.rotate_secret("db", backend=self.backend)
+        self.assertTrue(result.ok, result.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
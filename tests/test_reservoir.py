@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import unittest
+
+from sample import rotate
+from sample.backends import InMemoryBackend
+from sample.keys import PASSWORD
+from sample.reservoir import SecretReservoir
+
+
+class CountingGenerator:
+    def __init__(self):
+        self.calls = []
+        self.made = 0
+
+    def __call__(self, count, secret_type):
+        self.calls.append(count)
+        values = [f"{secret_type}-{self.made + i}" for i in range(count)]
+        self.made += count
+        return values
+
+
+class SecretReservoirTestSuite(unittest.TestCase):
+    """Background stock of pre-generated values."""
+
+    def make(self, **kwargs):
+        self.generate = CountingGenerator()
+        reservoir = SecretReservoir(generate=self.generate, **kwargs)
+        self.addCleanup(reservoir.close)
+        return reservoir
+
+    def test_fills_in_batches(self):
+        reservoir = self.make(size=10, batch=4)
+        self.assertTrue(reservoir.wait_full(5))
+        self.assertEqual(len(reservoir), 10)
+        self.assertEqual(self.generate.calls, [4, 4, 2])
+
+    def test_values_are_handed_out_once(self):
+        reservoir = self.make(size=8, batch=8)
+        reservoir.wait_full(5)
+        taken = [reservoir.take() for _ in range(20)]
+        self.assertEqual(len(set(taken)), 20)
+        self.assertEqual(reservoir.hits + reservoir.misses, 20)
+        self.assertGreaterEqual(reservoir.hits, 8)
+
+    def test_refills_below_low_water(self):
+        reservoir = self.make(size=8, low_water=4, batch=8)
+        reservoir.wait_full(5)
+        for _ in range(4):
+            reservoir.take()
+        self.assertTrue(reservoir.wait_full(5))
+        self.assertEqual(self.generate.calls, [8, 4])
+
+    def test_close_wipes_stock(self):
+        reservoir = self.make(size=4)
+        reservoir.wait_full(5)
+        buffers = list(reservoir._values)
+        reservoir.close()
+        self.assertEqual(len(reservoir), 0)
+        for buffer in buffers:
+            self.assertEqual(set(buffer), {0})
+
+    def test_take_wipes_reservoir_copy(self):
+        reservoir = self.make(size=1, low_water=0)
+        reservoir.wait_full(5)
+        buffer = reservoir._values[0]
+        value = reservoir.take()
+        self.assertEqual(value, "password-0")
+        self.assertEqual(set(buffer), {0})
+
+
+class RotationReservoirTestSuite(unittest.TestCase):
+    """createSecret taking values from a reservoir."""
+
+    def tearDown(self):
+        rotate.disable_reservoirs()
+
+    def test_create_secret_takes_from_reservoir(self):
+        reservoir = rotate.enable_reservoir(PASSWORD, size=4)
+        self.assertIs(rotate.enable_reservoir(PASSWORD), reservoir)
+        reservoir.wait_full(5)
+
+        backend = InMemoryBackend()
+        backend.create_secret(Name="db", SecretString="old")
+        result = rotate.rotate_secret("db", backend=backend)
+        self.assertTrue(result.ok)
+        self.assertEqual(reservoir.hits, 1)
+        value = backend.get_secret_value(SecretId="db")["SecretString"]
+        self.assertEqual(len(value), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
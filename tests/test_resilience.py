@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import unittest
+
+from sample import rotate
+from sample.backends import (CachingBackend, InMemoryBackend,
+                             SecretsBackendError, VersionCache)
+from sample.resilience import (AsyncRateLimitedBackend, CircuitBreaker,
+                               RateLimitedBackend, RateLimiter,
+                               ResilientBackend, RetryBudget, RetryPolicy,
+                               TokenBucket)
+
+
+class FlakyBackend(InMemoryBackend):
+    """Fails the first `failures` get_secret_value calls with `code`."""
+
+    def __init__(self, failures, code="ThrottlingException"):
+        super().__init__()
+        self.failures = failures
+        self.code = code
+        self.calls = 0
+
+    def get_secret_value(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise SecretsBackendError(self.code)
+        return super().get_secret_value(**kwargs)
+
+
+class AsyncFlakyBackend(FlakyBackend):
+    async def get_secret_value(self, **kwargs):
+        return FlakyBackend.get_secret_value(self, **kwargs)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResilientBackendTestSuite(unittest.TestCase):
+    """Retries, backoff, budgets and circuit breaking."""
+
+    def make(self, inner, **kwargs):
+        inner.create_secret(Name="db", SecretString="value")
+        self.delays = []
+        kwargs.setdefault("policy", RetryPolicy(max_attempts=5))
+        kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=100))
+        kwargs.setdefault("budget", RetryBudget())
+        return ResilientBackend(inner, sleep=self.delays.append, **kwargs)
+
+    def test_retries_throttling_with_growing_jitter(self):
+        inner = FlakyBackend(failures=3)
+        backend = self.make(inner)
+        response = backend.get_secret_value(SecretId="db")
+        self.assertEqual(response["SecretString"], "value")
+        self.assertEqual(inner.calls, 4)
+        self.assertEqual(len(self.delays), 3)
+        self.assertEqual(self.delays[0], 0.05)
+        for previous, delay in zip(self.delays, self.delays[1:]):
+            self.assertGreaterEqual(delay, 0.05)
+            self.assertLessEqual(delay, previous * 3)
+
+    def test_gives_up_after_max_attempts(self):
+        inner = FlakyBackend(failures=10)
+        backend = self.make(inner)
+        with self.assertRaises(SecretsBackendError):
+            backend.get_secret_value(SecretId="db")
+        self.assertEqual(inner.calls, 5)
+
+    def test_client_errors_are_not_retried(self):
+        inner = FlakyBackend(failures=1, code="ResourceNotFoundException")
+        backend = self.make(inner)
+        with self.assertRaises(SecretsBackendError):
+            backend.get_secret_value(SecretId="db")
+        self.assertEqual(inner.calls, 1)
+
+    def test_budget_limits_retries(self):
+        clock = Clock()
+        budget = RetryBudget(ratio=0.0, min_per_second=1.0, clock=clock)
+        inner = FlakyBackend(failures=100)
+        backend = self.make(inner, budget=budget)
+        for _ in range(3):
+            with self.assertRaises(SecretsBackendError):
+                backend.get_secret_value(SecretId="db")
+        # four retries for each of the first two calls, then the remaining
+        # balance of two runs out during the third
+        self.assertEqual(len(self.delays), 10)
+        self.assertEqual(inner.calls, 13)
+        self.assertFalse(budget.try_spend())
+        clock.now = 1.0
+        self.assertTrue(budget.try_spend())
+
+    def test_circuit_opens_and_recovers(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=3, recovery_time=5,
+                                 clock=clock)
+        inner = FlakyBackend(failures=3, code="ServiceUnavailable")
+        backend = self.make(inner, breaker=breaker,
+                            policy=RetryPolicy(max_attempts=1))
+        for _ in range(3):
+            with self.assertRaises(SecretsBackendError):
+                backend.get_secret_value(SecretId="db")
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(SecretsBackendError) as ctx:
+            backend.get_secret_value(SecretId="db")
+        self.assertEqual(ctx.exception.code, "CircuitOpen")
+        self.assertEqual(inner.calls, 3)
+
+        clock.now = 5
+        backend.get_secret_value(SecretId="db")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_throttling_does_not_open_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        inner = FlakyBackend(failures=4)
+        backend = self.make(inner, breaker=breaker)
+        backend.get_secret_value(SecretId="db")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_failure_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=5,
+                                 clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+    def test_async_backend(self):
+        inner = AsyncFlakyBackend(failures=2)
+        inner.create_secret(Name="db", SecretString="value")
+        backend = ResilientBackend(
+            inner, policy=RetryPolicy(max_attempts=5, base_delay=0.001),
+            breaker=CircuitBreaker(), budget=RetryBudget())
+        response = asyncio.run(backend.get_secret_value(SecretId="db"))
+        self.assertEqual(response["SecretString"], "value")
+        self.assertEqual(inner.calls, 3)
+
+
+class RateLimiterTestSuite(unittest.TestCase):
+    """Token buckets pacing calls per operation."""
+
+    def test_bucket_spaces_calls_beyond_burst(self):
+        clock = Clock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 0.1)
+        self.assertAlmostEqual(delays[3], 0.2)
+        clock.now = 1.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_limits_only_operations_with_quota(self):
+        clock = Clock()
+        limiter = RateLimiter({"put_secret_value": 1}, clock=clock)
+        self.assertEqual(limiter.reserve("put_secret_value"), 0.0)
+        self.assertGreater(limiter.reserve("put_secret_value"), 0.0)
+        self.assertEqual(limiter.reserve("get_secret_value"), 0.0)
+
+    def test_operations_share_a_quota(self):
+        clock = Clock()
+        limiter = RateLimiter(
+            {("put_secret_value", "update_secret_version_stage"): 1},
+            clock=clock)
+        self.assertEqual(limiter.reserve("put_secret_value"), 0.0)
+        self.assertGreater(limiter.reserve("update_secret_version_stage"),
+                           0.0)
+
+    def test_default_writes_share_a_quota(self):
+        buckets = RateLimiter().buckets
+        self.assertIs(buckets["put_secret_value"],
+                      buckets["update_secret_version_stage"])
+        self.assertIsNot(buckets["put_secret_value"],
+                         buckets["list_secret_version_ids"])
+
+    def test_sleeps_before_calling(self):
+        inner = FlakyBackend(failures=0)
+        inner.create_secret(Name="db", SecretString="value")
+        delays = []
+        backend = RateLimitedBackend(
+            inner, RateLimiter({"get_secret_value": 1}, clock=Clock()),
+            sleep=delays.append)
+        for _ in range(3):
+            backend.get_secret_value(SecretId="db")
+        self.assertEqual(inner.calls, 3)
+        # the default burst of 1.1 tokens lets the first call through
+        self.assertEqual(len(delays), 2)
+        self.assertAlmostEqual(delays[0], 0.9)
+        self.assertAlmostEqual(delays[1], 1.9)
+
+    def test_blocking_backend_on_event_loop_thread(self):
+        # a blocking stack called from a loop thread, Jupyter or an async
+        # app, still returns responses and not coroutines
+        inner = FlakyBackend(failures=0)
+        inner.create_secret(Name="db", SecretString="value")
+        delays = []
+        backend = RateLimitedBackend(
+            inner, RateLimiter({"get_secret_value": 1}, clock=Clock()),
+            sleep=delays.append)
+
+        async def run():
+            return [backend.get_secret_value(SecretId="db")
+                    for _ in range(3)]
+
+        responses = asyncio.run(run())
+        self.assertEqual([r["SecretString"] for r in responses],
+                         ["value"] * 3)
+        self.assertEqual(len(delays), 2)
+
+    def test_rotations_from_event_loop_thread(self):
+        inner = FlakyBackend(failures=0)
+        for i in range(5):
+            inner.create_secret(Name=f"s{i}", SecretString="old")
+        delays = []
+        limiter = RateLimiter({"put_secret_value": 1,
+                               "update_secret_version_stage": 1},
+                              clock=Clock())
+        backend = CachingBackend(
+            ResilientBackend(
+                RateLimitedBackend(inner, limiter, sleep=delays.append),
+                endpoint="loop-thread"),
+            VersionCache())
+
+        async def run():
+            return [rotate.rotate_secret(f"s{i}", backend=backend)
+                    for i in range(5)]
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result.ok for result in results))
+        self.assertGreater(len(delays), 0)
+
+    def test_does_not_block_event_loop(self):
+        inner = AsyncFlakyBackend(failures=0)
+        inner.create_secret(Name="db", SecretString="value")
+        backend = AsyncRateLimitedBackend(
+            inner, RateLimiter({"get_secret_value": 100}),
+            sleep=self.fail)
+
+        async def run():
+            calls = [backend.get_secret_value(SecretId="db")
+                     for _ in range(20)]
+            return await asyncio.gather(*calls)
+
+        responses = asyncio.run(run())
+        self.assertEqual(len(responses), 20)
+        self.assertEqual(inner.calls, 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
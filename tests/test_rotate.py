@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import asyncio
+import importlib.util
+import time
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from sample import rotate
+from sample.backends import (AWSCURRENT, AWSPREVIOUS, CachingBackend,
+                             InMemoryBackend, SecretsBackendError,
+                             ThreadedAsyncBackend)
+from sample.concurrency import AIMDLimit
+from sample.resilience import endpoint_rate_limiter
+
+HAS_BOTO3 = importlib.util.find_spec("boto3") is not None
+
+
+@unittest.skipUnless(HAS_BOTO3, "boto3 is not installed")
+class ClientCacheTestSuite(unittest.TestCase):
+    """Secrets Manager client cache."""
+
+    def setUp(self):
+        from sample import rotate
+        self.rotate = rotate
+        rotate.reset_client_cache()
+        self.addCleanup(rotate.reset_client_cache)
+
+    def test_client_is_reused(self):
+        first = self.rotate.get_secrets_client(region_name="us-east-1")
+        second = self.rotate.get_secrets_client(region_name="us-east-1")
+        self.assertIs(first, second)
+
+    def test_clients_are_keyed_by_region(self):
+        east = self.rotate.get_secrets_client(region_name="us-east-1")
+        west = self.rotate.get_secrets_client(region_name="us-west-2")
+        self.assertIsNot(east, west)
+
+    def test_botocore_retries_are_off(self):
+        client = self.rotate.get_secrets_client(region_name="us-east-1")
+        self.assertEqual(client.meta.config.retries["total_max_attempts"], 1)
+
+    def test_explicit_retries_are_kept(self):
+        from botocore.config import Config
+
+        config = Config(retries={"max_attempts": 3}, connect_timeout=2)
+        client = self.rotate.get_secrets_client(region_name="us-east-1",
+                                                config=config)
+        # botocore counts the first attempt in "total_max_attempts"
+        self.assertEqual(client.meta.config.retries["total_max_attempts"], 4)
+        self.assertEqual(client.meta.config.connect_timeout, 2)
+
+    def test_reset_builds_a_new_client(self):
+        first = self.rotate.get_secrets_client(region_name="us-east-1")
+        self.rotate.reset_client_cache()
+        second = self.rotate.get_secrets_client(region_name="us-east-1")
+        self.assertIsNot(first, second)
+
+
+class HandleEventTestSuite(unittest.TestCase):
+    """Rotation steps against the in-memory backend."""
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.create_secret(Name="db", SecretString="old",
+                                   ClientRequestToken="v1")
+
+    def run_step(self, step, token="v2"):
+        event = {"Step": step, "SecretId": "db", "ClientRequestToken": token}
+        return rotate.handle_event(event, None, backend=self.backend)
+
+    def test_full_rotation(self):
+        for step in ("createSecret", "setSecret", "testSecret",
+                     "finishSecret"):
+            self.assertIsNone(self.run_step(step))
+
+        current = self.backend.get_secret_value(SecretId="db")
+        self.assertEqual(current["VersionId"], "v2")
+        self.assertEqual(len(current["SecretString"]), 32)
+        previous = self.backend.get_secret_value(
+            SecretId="db", VersionStage=AWSPREVIOUS)
+        self.assertEqual(previous["VersionId"], "v1")
+        self.assertIn(AWSCURRENT, current["VersionStages"])
+
+    def test_replayed_steps_short_circuit(self):
+        rotate.step_counters.reset()
+        self.run_step("createSecret")
+        first = self.backend.get_secret_value(SecretId="db", VersionId="v2")
+        self.run_step("createSecret")
+        again = self.backend.get_secret_value(SecretId="db", VersionId="v2")
+        self.assertEqual(first["SecretString"], again["SecretString"])
+
+        for step in ("setSecret", "testSecret", "finishSecret"):
+            self.run_step(step)
+        for step in ("setSecret", "testSecret", "finishSecret"):
+            self.run_step(step)
+
+        counters = rotate.step_counters.snapshot()
+        self.assertEqual(counters["calls"], {
+            "createSecret": 2, "setSecret": 2, "testSecret": 2,
+            "finishSecret": 2})
+        self.assertEqual(counters["short_circuited"], {
+            "createSecret": 1, "setSecret": 1, "testSecret": 1,
+            "finishSecret": 1})
+        previous = self.backend.get_secret_value(
+            SecretId="db", VersionStage=AWSPREVIOUS)
+        self.assertEqual(previous["VersionId"], "v1")
+
+    def test_cached_replay_skips_generation(self):
+        self.backend = CachingBackend(self.backend, rotate.version_cache)
+        self.addCleanup(rotate.version_cache.clear)
+        self.run_step("createSecret")
+
+        def no_generation(secret_type):
+            raise AssertionError("generated a value for a replay")
+
+        original = rotate.new_secret_value
+        rotate.new_secret_value = no_generation
+        self.addCleanup(setattr, rotate, "new_secret_value", original)
+        rotate.step_counters.reset()
+        self.run_step("createSecret")
+        self.assertEqual(
+            rotate.step_counters.snapshot()["short_circuited"],
+            {"createSecret": 1})
+
+    def test_unknown_step(self):
+        with self.assertRaises(RuntimeError):
+            self.run_step("bogusSecret")
+
+
+class ListCountingBackend(InMemoryBackend):
+    list_calls = 0
+
+    def list_secret_version_ids(self, **kwargs):
+        self.list_calls += 1
+        return super().list_secret_version_ids(**kwargs)
+
+
+class FinishSecretTestSuite(unittest.TestCase):
+    """Paginated AWSCURRENT lookup in finishSecret."""
+
+    def setUp(self):
+        self.backend = ListCountingBackend()
+        self.backend.create_secret(Name="db", SecretString="v0",
+                                   ClientRequestToken="v0")
+        for i in range(1, 250):
+            self.backend.put_secret_value(
+                SecretId="db", ClientRequestToken=f"v{i}",
+                SecretString=f"v{i}", VersionStages=[f"label-{i}"])
+        self.backend.put_secret_value(
+            SecretId="db", ClientRequestToken="next", SecretString="next",
+            VersionStages=["AWSPENDING"])
+
+    def finish(self):
+        rotate.handle_event(
+            {"Step": "finishSecret", "SecretId": "db",
+             "ClientRequestToken": "next"},
+            None, backend=self.backend)
+
+    def test_stops_at_first_page_with_current(self):
+        self.finish()
+        self.assertEqual(self.backend.list_calls, 1)
+        previous = self.backend.get_secret_value(
+            SecretId="db", VersionStage=AWSPREVIOUS)
+        self.assertEqual(previous["VersionId"], "v0")
+
+    def test_follows_next_token(self):
+        self.backend.update_secret_version_stage(
+            SecretId="db", VersionStage=AWSCURRENT, MoveToVersionId="v249",
+            RemoveFromVersionId="v0")
+        self.finish()
+        self.assertEqual(self.backend.list_calls, 3)
+        previous = self.backend.get_secret_value(
+            SecretId="db", VersionStage=AWSPREVIOUS)
+        self.assertEqual(previous["VersionId"], "v249")
+
+
+class RotateManyTestSuite(unittest.TestCase):
+    """Bulk rotation on a thread pool."""
+
+    def test_failures_are_isolated(self):
+        backend = InMemoryBackend()
+        for name in ("a", "b", "c"):
+            backend.create_secret(Name=name, SecretString="old")
+
+        report = rotate.rotate_many(["a", "missing", "c"], backend=backend,
+                                    max_workers=2)
+
+        self.assertEqual([r.secret_id for r in report.results],
+                         ["a", "missing", "c"])
+        self.assertEqual([r.secret_id for r in report.failed], ["missing"])
+        self.assertEqual(report.failed[0].failed_step, "createSecret")
+        self.assertEqual(len(report.succeeded), 2)
+        self.assertGreater(report.throughput, 0)
+        for result in report.succeeded:
+            current = backend.get_secret_value(SecretId=result.secret_id)
+            self.assertEqual(current["VersionId"], result.token)
+
+    def test_token_factory(self):
+        backend = InMemoryBackend()
+        backend.create_secret(Name="a", SecretString="old")
+        report = rotate.rotate_many(["a"], backend=backend,
+                                    token_factory=lambda s: f"{s}-next")
+        self.assertEqual(report.results[0].token, "a-next")
+
+    def test_pipelined(self):
+        backend = InMemoryBackend()
+        names = [f"s{i}" for i in range(30)]
+        for name in names:
+            backend.create_secret(Name=name, SecretString="old")
+        report = rotate.rotate_many_pipelined(
+            ["missing"] + names, backend=backend, stage_workers=[2, 1, 1, 3],
+            queue_size=2, token_factory=lambda s: f"{s}-next")
+
+        self.assertEqual([r.secret_id for r in report.results],
+                         ["missing"] + names)
+        self.assertEqual([r.secret_id for r in report.failed], ["missing"])
+        for name in names:
+            current = backend.get_secret_value(SecretId=name)
+            self.assertEqual(current["VersionId"], f"{name}-next")
+
+    def test_pipelined_needs_a_worker_per_stage(self):
+        with self.assertRaises(ValueError):
+            rotate.rotate_many_pipelined([], backend=InMemoryBackend(),
+                                         stage_workers=[1, 1, 0, 1])
+
+    def test_adaptive(self):
+        backend = InMemoryBackend()
+        names = [f"s{i}" for i in range(20)]
+        for name in names:
+            backend.create_secret(Name=name, SecretString="old")
+        # in-memory latencies are too noisy to compare
+        limit = AIMDLimit(initial=2, max_limit=4, latency_tolerance=1e9)
+        report = rotate.rotate_many_adaptive(names + ["missing"],
+                                             backend=backend, limit=limit)
+        self.assertEqual([r.secret_id for r in report.results],
+                         names + ["missing"])
+        self.assertEqual([r.secret_id for r in report.failed], ["missing"])
+        self.assertGreater(limit.limit, 2)
+
+
+class AsyncRotationTestSuite(unittest.TestCase):
+    """asyncio rotation driver."""
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        for name in ("a", "b"):
+            self.backend.create_secret(Name=name, SecretString="old")
+
+    def test_handle_event_async(self):
+        async def rotate_all():
+            for step in rotate.ROTATION_STEPS:
+                await rotate.handle_event_async(
+                    {"Step": step, "SecretId": "a",
+                     "ClientRequestToken": "v2"},
+                    None, backend=ThreadedAsyncBackend(self.backend))
+
+        asyncio.run(rotate_all())
+        current = self.backend.get_secret_value(SecretId="a")
+        self.assertEqual(current["VersionId"], "v2")
+
+    def test_rotate_many_async(self):
+        report = asyncio.run(rotate.rotate_many_async(
+            ["a", "missing", "b"], backend=self.backend, concurrency=2))
+        self.assertEqual([r.secret_id for r in report.failed], ["missing"])
+        self.assertEqual(len(report.succeeded), 2)
+
+    def test_rotate_many_adaptive_async(self):
+        report = asyncio.run(rotate.rotate_many_adaptive_async(
+            ["a", "missing", "b"], backend=self.backend,
+            limit=AIMDLimit(initial=1)))
+        self.assertEqual([r.secret_id for r in report.results],
+                         ["a", "missing", "b"])
+        self.assertEqual([r.secret_id for r in report.failed], ["missing"])
+
+
+
+class FakeClient:
+    """Secrets Manager client backed by an in-memory store."""
+
+    def __init__(self, store, endpoint_url):
+        self.store = store
+        self.meta = types.SimpleNamespace(endpoint_url=endpoint_url)
+
+    def __getattr__(self, operation):
+        method = getattr(self.store, operation)
+
+        def call(**kwargs):
+            from botocore.exceptions import ClientError
+
+            try:
+                return method(**kwargs)
+            except SecretsBackendError as exc:
+                raise ClientError({"Error": {"Code": exc.code}}, operation)
+
+        return call
+
+
+class Wait:
+    """Token bucket making every caller wait `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def reserve(self):
+        return self.delay
+
+
+@unittest.skipUnless(HAS_BOTO3, "boto3 is not installed")
+class AsyncClientBackendTestSuite(unittest.TestCase):
+    """The default asyncio backend stack."""
+
+    def setUp(self):
+        self.store = InMemoryBackend()
+        self.store.create_secret(Name="db", SecretString="old")
+        endpoint = "https://secretsmanager.async-test.amazonaws.com"
+        client = FakeClient(self.store, endpoint)
+        original = rotate.get_secrets_client
+        rotate.get_secrets_client = lambda **kwargs: client
+        self.addCleanup(setattr, rotate, "get_secrets_client", original)
+        self.addCleanup(rotate.version_cache.clear)
+        self.limiter = endpoint_rate_limiter(endpoint)
+
+    def test_rotate(self):
+        result = asyncio.run(rotate.rotate_secret_async("db"))
+        self.assertTrue(result.ok, result.error)
+        current = self.store.get_secret_value(SecretId="db")
+        self.assertEqual(current["VersionId"], result.token)
+
+    def test_token_waits_hold_no_executor_thread(self):
+        self.limiter.buckets["put_secret_value"] = Wait(0.3)
+        self.addCleanup(self.limiter.buckets.pop, "put_secret_value")
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+            rotation = asyncio.ensure_future(rotate.rotate_secret_async("db"))
+            await asyncio.sleep(0.1)
+            start = time.monotonic()
+            await loop.run_in_executor(None, time.monotonic)
+            waited = time.monotonic() - start
+            return await rotation, waited
+
+        result, waited = asyncio.run(run())
+        self.assertTrue(result.ok, result.error)
+        self.assertLess(waited, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
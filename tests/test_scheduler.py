@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+from .context import sample
+
+import threading
+import time
+import unittest
+
+from sample.backends import InMemoryBackend, SecretsBackendError
+from sample.rotate import RotationResult
+from sample.scheduler import RotationScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RotationSchedulerTestSuite(unittest.TestCase):
+    """Heap of secrets by next-due time."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.scheduler = RotationScheduler(window=100, retry_delay=30,
+                                           clock=self.clock)
+
+    def test_pops_in_due_order(self):
+        self.scheduler.add("late", 1000, last_rotated=500)
+        self.scheduler.add("early", 1000, last_rotated=0)
+        self.scheduler.add("never", 1000)
+        self.assertEqual(self.scheduler.pop_due(100), ["never"])
+        self.assertEqual(self.scheduler.pop_due(1000), ["early"])
+        self.assertEqual(self.scheduler.pop_due(1500), ["late"])
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_cohort_is_spread_over_window(self):
+        for i in range(1000):
+            self.scheduler.add(f"secret-{i}", 1000, last_rotated=0)
+        self.assertGreaterEqual(self.scheduler.next_due(), 900)
+        buckets = [len(self.scheduler.pop_due(t)) for t in
+                   range(910, 1010, 10)]
+        self.assertEqual(sum(buckets), 1000)
+        # about 100 per tenth of the window, no burst at the due time
+        self.assertLess(max(buckets), 150)
+
+    def test_onboarding_is_spread_over_window(self):
+        for i in range(1000):
+            self.scheduler.add(f"secret-{i}", 1000)
+        buckets = [len(self.scheduler.pop_due(t)) for t in range(10, 110, 10)]
+        self.assertEqual(sum(buckets), 1000)
+        self.assertLess(max(buckets), 150)
+
+    def test_cohort_stays_spread_over_cycles(self):
+        for i in range(1000):
+            self.scheduler.add(f"secret-{i}", 1000, last_rotated=0)
+        dispatched = {}
+        for cycle in range(3):
+            buckets = []
+            for t in range(910 + cycle * 1000, 1010 + cycle * 1000, 10):
+                self.clock.now = t
+                due = self.scheduler.pop_due(t)
+                buckets.append(len(due))
+                for secret_id in due:
+                    dispatched.setdefault(secret_id, []).append(t)
+                    self.scheduler.complete(
+                        RotationResult(secret_id, "v2", 1.0))
+            self.assertEqual(sum(buckets), 1000)
+            self.assertLess(max(buckets), 150)
+        # each secret in the same tenth of the window, once per interval
+        for times in dispatched.values():
+            self.assertEqual([b - a for a, b in zip(times, times[1:])],
+                             [1000, 1000])
+
+    def test_retries_keep_the_slot(self):
+        self.scheduler.add("a", 1000, last_rotated=0)
+        due = self.scheduler.next_due()
+        self.assertEqual(self.scheduler.pop_due(due), ["a"])
+        self.clock.now = due
+        self.scheduler.complete(RotationResult(
+            "a", "v2", 1.0, "setSecret", SecretsBackendError("Oops")))
+        self.clock.now = due + 30
+        self.assertEqual(self.scheduler.pop_due(), ["a"])
+        self.scheduler.complete(RotationResult("a", "v2", 1.0))
+        self.assertEqual(self.scheduler.next_due(), due + 1000)
+
+    def test_fallen_behind_skips_to_next_slot(self):
+        self.scheduler.add("a", 1000, last_rotated=0)
+        due = self.scheduler.next_due()
+        self.scheduler.pop_due(due)
+        # finished after the scheduler was stopped for most of an interval
+        self.clock.now = due + 800
+        self.scheduler.complete(RotationResult("a", "v2", 1.0))
+        self.assertEqual(self.scheduler.next_due(), due + 2000)
+
+    def test_results_are_bounded(self):
+        scheduler = RotationScheduler(clock=self.clock, keep_results=2)
+        for secret_id in ("a", "b", "c"):
+            scheduler.complete(RotationResult(secret_id, "v2", 1.0))
+        scheduler.complete(RotationResult(
+            "d", "v2", 1.0, "setSecret", SecretsBackendError("Oops")))
+        self.assertEqual([r.secret_id for r in scheduler.results], ["c", "d"])
+        self.assertEqual(scheduler.rotations, 4)
+        self.assertEqual(scheduler.failures, 1)
+
+    def test_reschedules_after_rotation(self):
+        self.scheduler.add("ok", 1000)
+        self.scheduler.add("bad", 1000)
+        self.assertEqual(len(self.scheduler.pop_due(100)), 2)
+        self.assertIsNone(self.scheduler.next_due())
+        self.assertEqual(len(self.scheduler), 2)
+
+        self.clock.now = 10
+        self.scheduler.complete(RotationResult("ok", "v2", 1.0))
+        self.scheduler.complete(RotationResult(
+            "bad", "v2", 1.0, "setSecret", SecretsBackendError("Oops")))
+        self.assertEqual(self.scheduler.pop_due(40), ["bad"])
+        self.assertEqual(self.scheduler.pop_due(909), [])
+        self.assertEqual(self.scheduler.pop_due(1100), ["ok"])
+
+    def test_add_again_and_remove(self):
+        self.scheduler.add("a", 1000, last_rotated=0)
+        self.scheduler.add("a", 10, last_rotated=0)
+        self.scheduler.add("b", 10, last_rotated=0)
+        self.scheduler.remove("b")
+        self.assertEqual(self.scheduler.pop_due(10), ["a"])
+        self.assertEqual(self.scheduler.pop_due(2000), [])
+
+    def test_run_rotates_due_secrets(self):
+        backend = InMemoryBackend()
+        for name in ("a", "b", "c"):
+            backend.create_secret(Name=name, SecretString="old")
+        scheduler = RotationScheduler(backend=backend, max_workers=2,
+                                      window=0)
+        for name in ("a", "b", "c"):
+            scheduler.add(name, 3600)
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while len(scheduler.results) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.stop()
+        thread.join(5)
+
+        self.assertEqual(len(scheduler.results), 3)
+        self.assertTrue(all(result.ok for result in scheduler.results))
+        self.assertGreater(scheduler.next_due(), time.time() + 1000)
+        for name in ("a", "b", "c"):
+            self.assertEqual(len(backend._secrets[name].versions), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()